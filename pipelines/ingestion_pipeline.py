@@ -1,17 +1,37 @@
 from zenml import pipeline
 from loguru import logger
+from jarvis.settings import settings
 from steps import ingestion as ingestion_steps
 
 
 @pipeline
-def ingestion_pipeline():
+def ingestion_pipeline(
+    object_keys: list[str] | None = None,
+    per_document: bool = True,
+    streaming: bool = settings.INGESTION_STREAMING,
+):
     """
     This is the main orchestrator for the all the ingestion and feature engineering steps
     Parser -> Chunker -> Processor -> Embedder
+    When `object_keys` is given only those objects are fetched instead of the whole bucket.
+    With `per_document` each document advances and gets loaded on its own; otherwise every
+    stage runs for all documents before the next one starts. `streaming` additionally
+    parses each book page by page inside its flow instead of in a parsing step before it.
     """
-    raw_documents = ingestion_steps.fetch_from_storage()
+    raw_documents = ingestion_steps.fetch_from_storage(object_keys=object_keys)
+
+    if per_document and streaming:
+        loaded_step = ingestion_steps.stream_documents(raw_documents=raw_documents)
+
+        return [loaded_step.invocation_id]
+
     parsed_documents = ingestion_steps.parse_documents(raw_documents)
 
+    if per_document:
+        loaded_step = ingestion_steps.process_documents(parsed_documents=parsed_documents)
+
+        return [loaded_step.invocation_id]
+
     storable_parents, sections_for_processing = ingestion_steps.structure_documents(
         parsed_documents=parsed_documents
     )
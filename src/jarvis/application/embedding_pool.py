@@ -0,0 +1,161 @@
+import os
+import signal
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from loguru import logger
+from numpy.typing import NDArray
+
+from jarvis.settings import settings
+
+
+def _init_worker(threads_per_worker: int) -> None:
+    # Ctrl+C goes to the parent, which shuts the pool down in order
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # OpenMP and MKL size their thread pools when they are first loaded,
+    # so the limits have to be in place before torch or a runtime is imported
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[variable] = str(threads_per_worker)
+
+    import torch
+
+    torch.set_num_threads(threads_per_worker)
+
+    from jarvis.application.embeddings import EmbeddingModelSingleton
+
+    # ONNX Runtime and OpenVINO ignore the above and take their own intra-op thread count
+    EmbeddingModelSingleton(num_threads=threads_per_worker)
+
+
+def _warm_up() -> None:
+    pass
+
+
+def _embed_in_worker(texts: list[str]) -> tuple[NDArray[np.float32], int, dict, dict]:
+    from jarvis.application.embeddings import EmbeddingModelSingleton
+
+    model = EmbeddingModelSingleton()
+    return model(texts, to_list=False), os.getpid(), model.metrics(), model.model_info()
+
+
+class EmbeddingWorkerPool:
+    """
+    `num_workers` spawned processes, each loading its own copy of the embedding model
+    with `threads_per_worker` intra-op threads, fed from the executor's shared call queue.
+
+    `embed` is a coroutine: large inputs are split into tasks of up to `task_size` texts
+    of similar length, so one document spreads over several workers while the event loop
+    keeps serving LLM calls. Use it as a context manager; leaving it finishes the running
+    tasks, drops the queued ones and joins the workers.
+    """
+
+    def __init__(
+        self,
+        num_workers: int | None = settings.EMBEDDING_WORKERS,
+        threads_per_worker: int = settings.EMBEDDING_THREADS_PER_WORKER,
+        task_size: int = 256,
+    ) -> None:
+        self._num_workers = num_workers or max(
+            (os.cpu_count() or 1) // threads_per_worker, 1
+        )
+        self._threads_per_worker = threads_per_worker
+        self._task_size = task_size
+        self._executor: ProcessPoolExecutor | None = None
+        self._num_tasks = 0
+        self._num_texts = 0
+        self._worker_metrics: dict[int, dict] = {}
+        self._model_info: dict | None = None
+
+    def __enter__(self) -> "EmbeddingWorkerPool":
+        logger.info(
+            f"Starting {self._num_workers} embedding workers with "
+            f"{self._threads_per_worker} threads each."
+        )
+        # Forking a process that already initialized torch threads can deadlock
+        self._executor = ProcessPoolExecutor(
+            max_workers=self._num_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self._threads_per_worker,),
+        )
+        # Workers are spawned on demand; start them all now so the models load while the
+        # first documents are still waiting for their LLM calls
+        for _ in range(self._num_workers):
+            self._executor.submit(_warm_up)
+
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            logger.info("Embedding workers stopped.")
+
+    async def embed(self, texts: list[str]) -> NDArray[np.float32]:
+        """Embeddings of `texts` in input order, as one float32 matrix."""
+        if self._executor is None:
+            raise RuntimeError("EmbeddingWorkerPool is not running.")
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        # Character length stands in for token length when grouping texts into tasks
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        tasks = [
+            order[start : start + self._task_size]
+            for start in range(0, len(order), self._task_size)
+        ]
+
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    self._executor, _embed_in_worker, [texts[i] for i in task]
+                )
+                for task in tasks
+            )
+        )
+
+        vectors = None
+        for task, (task_vectors, pid, worker_metrics, model_info) in zip(tasks, results):
+            if len(task_vectors) != len(task):
+                raise RuntimeError(f"Embedding worker {pid} failed to embed its task.")
+            if vectors is None:
+                vectors = np.zeros((len(texts), task_vectors.shape[1]), dtype=np.float32)
+            vectors[task] = task_vectors
+            self._worker_metrics[pid] = worker_metrics
+            self._model_info = model_info
+
+        self._num_tasks += len(tasks)
+        self._num_texts += len(texts)
+
+        return vectors
+
+    @property
+    def model_info(self) -> dict | None:
+        """The workers' `EmbeddingModelSingleton.model_info`, known after the first `embed`."""
+        return self._model_info
+
+    def metrics(self) -> dict:
+        # Each worker reports its running totals, so the latest report per worker adds up
+        num_tokens = sum(m["num_tokens"] for m in self._worker_metrics.values())
+        num_padded_tokens = sum(
+            m["num_padded_tokens"] for m in self._worker_metrics.values()
+        )
+        return {
+            "num_workers": self._num_workers,
+            "threads_per_worker": self._threads_per_worker,
+            "num_tasks": self._num_tasks,
+            "num_texts": self._num_texts,
+            "padding_ratio": (
+                round((num_padded_tokens - num_tokens) / num_padded_tokens, 3)
+                if num_padded_tokens
+                else None
+            ),
+            "workers": {str(pid): m for pid, m in self._worker_metrics.items()},
+        }
@@ -1,3 +1,9 @@
+import os
+import re
+import fcntl
+import shutil
+import tempfile
+from contextlib import contextmanager
 from functools import cached_property
 from pathlib import Path
 from typing import Optional
@@ -9,14 +15,146 @@ from sentence_transformers.SentenceTransformer import SentenceTransformer
 from sentence_transformers.cross_encoder import CrossEncoder
 from transformers import AutoTokenizer
 
+from jarvis.infrastructure.cache import EmbeddingCache
 from jarvis.settings import settings
 
 from .base import SingletonMeta
 
+INFERENCE_BACKENDS = ("torch", "onnx", "onnx-int8", "openvino")
+
+
+def load_inference_model(
+    model_class: type[SentenceTransformer] | type[CrossEncoder],
+    model_id: str,
+    backend: str,
+    device: str,
+    cache_dir: Optional[Path] = None,
+    num_threads: Optional[int] = None,
+) -> SentenceTransformer | CrossEncoder:
+    """
+    Loads a sentence-transformers model on the given inference backend.
+    `num_threads` caps the runtime's intra-op threads, e.g. for one of several worker processes.
+    The ONNX / OpenVINO export, and the int8 dynamic quantization for "onnx-int8", are done
+    once and kept under INGESTION_CACHE_DIR/models; later loads read the exported files.
+    Exports are written aside and renamed into place under a file lock, so processes
+    loading the model at the same time never see a half-written export.
+    """
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}")
+
+    cache_kwargs = {"cache_folder": str(cache_dir)} if cache_dir else {}
+    if backend == "torch":
+        return model_class(model_id, device=device, **cache_kwargs)
+
+    runtime = "openvino" if backend == "openvino" else "onnx"
+    safe_model_id = re.sub(r"[^\w.-]", "_", model_id)
+    artifact_dir = Path(settings.INGESTION_CACHE_DIR) / "models" / f"{safe_model_id}-{runtime}"
+    file_name = (
+        f"onnx/model_qint8_{settings.RAG_MODEL_QUANTIZATION}.onnx"
+        if backend == "onnx-int8"
+        else None
+    )
+
+    artifact_dir.parent.mkdir(parents=True, exist_ok=True)
+    # Pool workers start together; the first one exports while the others wait for it
+    with open(artifact_dir.parent / f"{artifact_dir.name}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            if not artifact_dir.exists():
+                logger.info(f"Exporting {model_id} to {runtime}, this happens only once.")
+                with _scratch_dir(artifact_dir.parent) as scratch:
+                    exported = model_class(
+                        model_id, backend=runtime, device=device, **cache_kwargs
+                    )
+                    exported.save_pretrained(str(scratch))
+                    os.replace(scratch, artifact_dir)
+
+            if file_name and not (artifact_dir / file_name).exists():
+                from sentence_transformers.backend import export_dynamic_quantized_onnx_model
+
+                logger.info(
+                    f"Quantizing {model_id} to int8 ({settings.RAG_MODEL_QUANTIZATION}), "
+                    "this happens only once."
+                )
+                with _scratch_dir(artifact_dir.parent) as scratch:
+                    export_dynamic_quantized_onnx_model(
+                        model_class(str(artifact_dir), backend="onnx", device=device),
+                        quantization_config=settings.RAG_MODEL_QUANTIZATION,
+                        model_name_or_path=str(scratch),
+                    )
+                    os.replace(scratch / file_name, artifact_dir / file_name)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    model_kwargs = {"file_name": file_name} if file_name else {}
+    if num_threads and runtime == "onnx":
+        import onnxruntime
+
+        session_options = onnxruntime.SessionOptions()
+        session_options.intra_op_num_threads = num_threads
+        session_options.inter_op_num_threads = 1
+        model_kwargs["session_options"] = session_options
+    elif num_threads:
+        model_kwargs["ov_config"] = {"INFERENCE_NUM_THREADS": str(num_threads)}
+
+    return model_class(
+        str(artifact_dir),
+        backend=runtime,
+        device=device,
+        model_kwargs=model_kwargs or None,
+    )
+
+
+@contextmanager
+def _scratch_dir(parent: Path):
+    """
+    A temporary directory next to the final location, so the finished export can be moved
+    into place with one rename and an interrupted one never looks complete.
+    """
+    scratch = Path(tempfile.mkdtemp(dir=parent, prefix=".export-"))
+    try:
+        yield scratch
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def plan_length_batches(
+    lengths: list[int], max_tokens: int, max_batch_size: int
+) -> list[list[int]]:
+    """
+    Groups input positions into batches of similar length.
+    Inputs are taken shortest first and a batch is closed once its padded size (batch size
+    times its longest input) would exceed `max_tokens`, so short texts are batched in large
+    numbers and long ones in small, without either padding the other.
+    """
+    batches, current, longest = [], [], 0
+    for i in sorted(range(len(lengths)), key=lengths.__getitem__):
+        padded_longest = max(longest, lengths[i])
+        if current and (
+            len(current) >= max_batch_size
+            or (len(current) + 1) * padded_longest > max_tokens
+        ):
+            batches.append(current)
+            current, padded_longest = [], lengths[i]
+
+        current.append(i)
+        longest = padded_longest
+
+    if current:
+        batches.append(current)
+
+    return batches
+
 
 class EmbeddingModelSingleton(metaclass=SingletonMeta):
     """
-    Class that provides access to a pre-trained transformer model for generating embeddings
+    Class that provides access to a pre-trained transformer model for generating embeddings.
+    With `use_cache` vectors are looked up by the hash of their normalized text first and
+    only the misses are encoded, so re-ingesting unchanged content skips the model.
+    Misses are encoded in length-sorted batches sized by a padded token budget and returned
+    in input order; pass whole documents at once so the batches can be formed well.
+    `backend` selects the inference runtime and `num_threads` its thread count, see
+    `load_inference_model`.
     """
 
     def __init__(
@@ -24,14 +162,31 @@ class EmbeddingModelSingleton(metaclass=SingletonMeta):
         model_id: str = settings.TEXT_EMBEDDING_MODEL_ID,
         device: str = settings.RAG_MODEL_DEVICE,
         cache_dir: Optional[Path] = None,
+        use_cache: bool = settings.EMBEDDING_CACHE_ENABLED,
+        batch_max_tokens: int = settings.EMBEDDING_BATCH_MAX_TOKENS,
+        batch_max_size: int = settings.EMBEDDING_BATCH_MAX_SIZE,
+        backend: str = settings.RAG_MODEL_BACKEND,
+        num_threads: Optional[int] = None,
     ) -> None:
         self._model_id = model_id
         self._device = device
+        self._backend = backend
+        self._use_cache = use_cache
+        self._batch_max_tokens = batch_max_tokens
+        self._batch_max_size = batch_max_size
+        self._num_cache_hits = 0
+        self._num_encoded = 0
+        self._num_batches = 0
+        self._num_tokens = 0
+        self._num_padded_tokens = 0
 
-        self._model = SentenceTransformer(
+        self._model = load_inference_model(
+            SentenceTransformer,
             self._model_id,
-            device=self._device,
-            cache_folder=cache_dir if cache_dir else None,
+            backend,
+            self._device,
+            cache_dir,
+            num_threads=num_threads,
         )
         self._model.eval()
 
@@ -53,6 +208,10 @@ class EmbeddingModelSingleton(metaclass=SingletonMeta):
 
         return dummy_embedding.shape[0]
 
+    @property
+    def backend(self) -> str:
+        return self._backend
+
     @property
     def max_input_length(self) -> int:
         """
@@ -71,6 +230,90 @@ class EmbeddingModelSingleton(metaclass=SingletonMeta):
 
         return self._model.tokenizer
 
+    @cached_property
+    def _cache(self) -> EmbeddingCache | None:
+        if not self._use_cache:
+            return None
+
+        # Quantized runtimes produce slightly different vectors, so they get their own cache
+        return EmbeddingCache(
+            Path(settings.INGESTION_CACHE_DIR) / "embeddings",
+            model_id=(
+                self._model_id
+                if self._backend == "torch"
+                else f"{self._model_id}@{self._backend}"
+            ),
+            dim=self.embedding_size,
+            max_bytes=settings.EMBEDDING_CACHE_MAX_BYTES,
+        )
+
+    def _token_lengths(self, texts: list[str]) -> list[int]:
+        encoded = self._model.tokenizer(
+            texts, truncation=True, max_length=self.max_input_length
+        )
+
+        return [len(input_ids) for input_ids in encoded["input_ids"]]
+
+    def _encode_batched(self, texts: list[str]) -> NDArray[np.float32]:
+        lengths = self._token_lengths(texts)
+        vectors = np.zeros((len(texts), self.embedding_size), dtype=np.float32)
+
+        for batch in plan_length_batches(
+            lengths, self._batch_max_tokens, self._batch_max_size
+        ):
+            vectors[batch] = self._model.encode(
+                [texts[i] for i in batch], batch_size=len(batch)
+            )
+
+            self._num_batches += 1
+            self._num_tokens += sum(lengths[i] for i in batch)
+            self._num_padded_tokens += len(batch) * max(lengths[i] for i in batch)
+
+        self._num_encoded += len(texts)
+
+        return vectors
+
+    def _encode(self, texts: list[str]) -> NDArray[np.float32]:
+        """Embeddings of `texts`, encoding only the ones missing from the cache."""
+        if self._cache is None:
+            return self._encode_batched(texts)
+
+        vectors, misses = self._cache.get_many(texts)
+        self._num_cache_hits += len(texts) - len(misses)
+
+        if misses:
+            missing_texts = [texts[i] for i in misses]
+            encoded = self._encode_batched(missing_texts)
+            vectors[misses] = encoded
+            self._cache.put_many(missing_texts, encoded)
+
+        return vectors
+
+    def model_info(self) -> dict:
+        """What embedded documents record about the model that produced their vectors."""
+        return {
+            "embedding_model_id": self.model_id,
+            "embedding_size": self.embedding_size,
+            "max_input_length": self.max_input_length,
+        }
+
+    def metrics(self) -> dict:
+        """Cache hits, encoded inputs and the share of encoded tokens that were padding."""
+        padding = self._num_padded_tokens - self._num_tokens
+        return {
+            "cache_enabled": self._use_cache,
+            "num_cache_hits": self._num_cache_hits,
+            "num_encoded": self._num_encoded,
+            "num_batches": self._num_batches,
+            "num_tokens": self._num_tokens,
+            "num_padded_tokens": self._num_padded_tokens,
+            "padding_ratio": (
+                round(padding / self._num_padded_tokens, 3)
+                if self._num_padded_tokens
+                else None
+            ),
+        }
+
     def __call__(
         self, input_text: str | list[str], to_list: bool = True
     ) -> NDArray[np.float32] | list[float] | list[list[float]]:
@@ -86,7 +329,10 @@ class EmbeddingModelSingleton(metaclass=SingletonMeta):
         """
 
         try:
-            embeddings = self._model.encode(input_text)
+            if isinstance(input_text, str):
+                embeddings = self._encode([input_text])[0]
+            else:
+                embeddings = self._encode(input_text)
         except Exception as e:
             logger.error(
                 f"Error while generating embeddings {e} {self._model_id=} and {input_text=}"
@@ -109,12 +355,17 @@ class CrossEncoderModelSingleton(metaclass=SingletonMeta):
         self,
         model_id: str = settings.RERANKING_CROSS_ENCODER,
         device: str = settings.RAG_MODEL_DEVICE,
+        backend: str = settings.RAG_MODEL_BACKEND,
+        num_threads: Optional[int] = None,
     ) -> None:
         self._model_id = model_id
         self._device = device
+        self._backend = backend
 
-        self._model = CrossEncoder(model_name=self._model_id, device=self._device)
-        self._model.model.eval()
+        self._model = load_inference_model(
+            CrossEncoder, self._model_id, backend, self._device, num_threads=num_threads
+        )
+        self._model.eval()
 
     def __call__(self, pairs: list[tuple[str, str]], to_list: bool = True):
         scores = self._model.predict(pairs)
@@ -123,3 +374,48 @@ class CrossEncoderModelSingleton(metaclass=SingletonMeta):
             scores = scores.tolist()
 
         return scores
+
+
+def check_backend_parity(
+    backend: str, texts: list[str], query: str, device: str = settings.RAG_MODEL_DEVICE
+) -> dict:
+    """
+    Compares `backend` against the fp32 PyTorch models: cosine similarity of the embeddings
+    of `texts`, and the cross-encoder scores of (`query`, text) pairs.
+    """
+    pairs = [(query, text) for text in texts]
+    reports = {}
+    for name, model_class, model_id, run in (
+        (
+            "embedding",
+            SentenceTransformer,
+            settings.TEXT_EMBEDDING_MODEL_ID,
+            lambda model: model.encode(texts),
+        ),
+        (
+            "cross_encoder",
+            CrossEncoder,
+            settings.RERANKING_CROSS_ENCODER,
+            lambda model: model.predict(pairs),
+        ),
+    ):
+        reference = run(load_inference_model(model_class, model_id, "torch", device))
+        candidate = run(load_inference_model(model_class, model_id, backend, device))
+
+        if name == "embedding":
+            cosines = np.sum(reference * candidate, axis=1) / (
+                np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1)
+            )
+            reports[name] = {
+                "mean_cosine": float(cosines.mean()),
+                "min_cosine": float(cosines.min()),
+            }
+        else:
+            reports[name] = {
+                "max_abs_score_diff": float(np.abs(reference - candidate).max()),
+                "same_ranking": bool(
+                    (np.argsort(-reference) == np.argsort(-candidate)).all()
+                ),
+            }
+
+    return reports
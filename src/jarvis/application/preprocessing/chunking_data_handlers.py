@@ -1,19 +1,63 @@
-import re
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar
+from collections import defaultdict
+from typing import AsyncIterator, Callable, Generic, TypeVar
 from uuid import UUID
 
 from jarvis.domain.chunks import Chunk
 from jarvis.domain.documents import DocumentSection
-from jarvis.domain.books import ParsedBookDocument, ChapterContent
+from jarvis.domain.books import (
+    Chapter,
+    ChapterContent,
+    OutlineEntry,
+    ParsedBookDocument,
+)
 from jarvis.infrastructure.llm_clients import get_toc_from_llm
 
+from .headings import HEADING_PATTERN, HeadingIndex
+
 
 # from .operations import chunk_book, chunk_text
 
 ParsedBookDocumentT = TypeVar("ParsedBookDocumentT", bound=ParsedBookDocument)
 ChunkT = TypeVar("ChunkT", bound=Chunk)
 
+_TOC_TITLES = {"table of contents", "contents", "toc"}
+# How far past the previous match a ToC title is looked for, in average chapters' worth
+# of headings, and never fewer than the minimum
+_TOC_MATCH_WINDOW_CHAPTERS = 4
+_MIN_TOC_MATCH_WINDOW = 64
+# How many upcoming ToC titles a heading is compared with while streaming, so titles
+# that match nothing are skipped over
+_TOC_STREAM_LOOKAHEAD = 8
+
+# (offset in the page, title, chapter number or None to count chapters) of the chapters
+# starting on a page
+_StartFinder = Callable[[int, str], list[tuple[int, str, int | str | None]]]
+
+
+class _SectionBuffer:
+    """Accumulates the markdown of the chapter currently being streamed."""
+
+    def __init__(
+        self, title: str, chapter_number: int | str | None, page_start: int | None
+    ) -> None:
+        self.title = title
+        self.chapter_number = chapter_number
+        self.page_start = page_start
+        self.page_breaks: list[int] = []
+        self.parts: list[str] = []
+        self.length = 0
+
+    def append(self, text: str, page_break: bool = False) -> None:
+        if page_break and self.length:
+            self.page_breaks.append(self.length)
+        self.parts.append(text)
+        self.length += len(text)
+
+    @property
+    def content(self) -> str:
+        return "".join(self.parts)
+
 
 class ChunkingDataHandler(ABC, Generic[ParsedBookDocumentT, ChunkT]):
     """
@@ -31,16 +75,27 @@ class PDFChunkingHandler(ChunkingDataHandler):
     async def chunk(self, data_model: ParsedBookDocument) -> list[ChapterContent]:
         """
         Parses and splits full markdown doc (a parsed PDF of a book) into a list of ChapterContent objects.
+        Chapters come from the PDF's bookmark outline when it has one; otherwise the
+        textual table of contents is structured by the LLM.
         """
         md_text = data_model.content_md
 
         base_metadata = {"document_id": data_model.id, **data_model.metadata}
 
-        pattern = (
-            r"(^(#{1,2})\s*(?:Table of Contents|Contents|TOC)[\s\S]*?)(?=\n^\2\s+)"
+        headings = HeadingIndex(md_text)
+
+        starts = self._chapter_starts_from_outline(data_model, headings)
+        if starts:
+            return self._slice_chapters(data_model, starts, base_metadata)
+
+        toc_position = headings.find_section(_TOC_TITLES, max_level=2)
+        # The ToC runs until the next heading of its own level
+        toc_end_position = (
+            headings.next_at_level(toc_position, headings.headings[toc_position].level)
+            if toc_position is not None
+            else None
         )
-        match = re.search(pattern, md_text, re.MULTILINE | re.IGNORECASE)
-        if not match:
+        if toc_end_position is None:
             # Handle books with no ToC: treat the whole book as one chapter
             return [
                 ChapterContent(
@@ -48,40 +103,364 @@ class PDFChunkingHandler(ChunkingDataHandler):
                     chapter_number=1,
                     content=md_text,
                     metadata=base_metadata,
+                    **self._page_fields(data_model, 0, len(md_text)),
                 )
             ]
 
-        toc_text = match.group(1).strip()
+        toc_start = headings.headings[toc_position].offset
+        toc_end = headings.headings[toc_end_position].offset
+
+        toc_text = md_text[toc_start:toc_end].strip()
         toc_structured = await get_toc_from_llm(toc_text=toc_text)
         if not toc_structured:
             return []
 
+        # Chapters appear in ToC order after the ToC itself, so each lookup resumes
+        # from the previous match. A lookup scans a few chapters' worth of headings at most,
+        # so ToC titles that match nothing don't each cost a scan to the end of the book.
+        starts = []
+        position = toc_end_position
+        window = max(
+            _MIN_TOC_MATCH_WINDOW,
+            _TOC_MATCH_WINDOW_CHAPTERS * len(headings) // len(toc_structured),
+        )
+        for chapter in toc_structured:
+            match = headings.match(
+                chapter.chapter_title,
+                start=position,
+                max_level=4,
+                end=position + window,
+            )
+            if match is None:
+                continue
+            offset = headings.headings[match].offset
+            starts.append((chapter.chapter_title, chapter.chapter_number, offset))
+            position = match + 1
+
+        return self._slice_chapters(data_model, starts, base_metadata)
+
+    @staticmethod
+    def _chapter_starts_from_outline(
+        data_model: ParsedBookDocument, headings: HeadingIndex
+    ) -> list[tuple[str, int, int]]:
+        """
+        Returns (title, chapter number, offset) for the chapters in the PDF outline.
+        Uses the shallowest outline level with more than one entry, so a lone root bookmark
+        holding the book title is skipped. A chapter starts at its heading on the target page,
+        or at the top of that page when no heading matches.
+        """
+        page_count = len(data_model.page_breaks)
+        entries = [e for e in data_model.outline if 1 <= e.page <= page_count]
+        levels = sorted({e.level for e in entries})
+        level = next(
+            (lvl for lvl in levels if sum(e.level == lvl for e in entries) > 1), None
+        )
+        if level is None:
+            return []
+
+        starts = []
+        for entry in (e for e in entries if e.level == level):
+            page_start = data_model.page_breaks[entry.page - 1]
+            page_end = (
+                data_model.page_breaks[entry.page]
+                if entry.page < page_count
+                else len(data_model.content_md)
+            )
+
+            # Only headings on the bookmark's own page are candidates
+            start = page_start
+            match = headings.match(
+                entry.title,
+                start=headings.position_after(page_start - 1),
+                end=headings.position_after(page_end - 1),
+            )
+            if match is not None:
+                start = headings.headings[match].offset
+
+            # Bookmarks pointing backwards or at an already claimed spot add no chapter
+            if starts and start <= starts[-1][2]:
+                continue
+            starts.append((entry.title.strip(), len(starts) + 1, start))
+
+        return starts
+
+    def _slice_chapters(
+        self,
+        data_model: ParsedBookDocument,
+        starts: list[tuple[str, int | str, int]],
+        base_metadata: dict,
+    ) -> list[ChapterContent]:
+        """Cuts content_md into chapters running from each start offset to the next one."""
+        md_text = data_model.content_md
+
         chapters_with_content = []
-        for i, chapter in enumerate(toc_structured):
-            # get the start of this chapter and get everything up to the start of next chapter
-            start_title = re.escape(chapter.chapter_title)
-
-            if i + 1 < len(toc_structured):
-                end_title = re.escape(toc_structured[i + 1].chapter_title)
-                # Pattern to find content between this chapter's title and the next
-                pattern = (
-                    rf"(^(#{{1,4}})\s*{start_title}[\s\S]*?)(?=\n^\2\s*{end_title})"
-                )
-            else:
-                # This is the last chapter, so it goes to the end of the document
-                pattern = rf"(^(#{{1,4}})\s*{start_title}[\s\S]*$)"
-
-            chapter_match = re.search(pattern, md_text, re.MULTILINE | re.IGNORECASE)
-
-            if chapter_match:
-                content = chapter_match.group(1).strip()
-                chapters_with_content.append(
-                    ChapterContent(
-                        chapter_number=chapter.chapter_number,
-                        title=chapter.chapter_title,
-                        content=content,
-                        metadata=base_metadata,
-                    )
+        for i, (title, chapter_number, start) in enumerate(starts):
+            end = starts[i + 1][2] if i + 1 < len(starts) else len(md_text)
+            raw_content = md_text[start:end]
+            content = raw_content.strip()
+            if not content:
+                continue
+            start += len(raw_content) - len(raw_content.lstrip())
+
+            chapters_with_content.append(
+                ChapterContent(
+                    chapter_number=chapter_number,
+                    title=title,
+                    content=content,
+                    metadata=base_metadata,
+                    **self._page_fields(data_model, start, start + len(content)),
                 )
+            )
 
         return chapters_with_content
+
+    @staticmethod
+    def _page_fields(data_model: ParsedBookDocument, start: int, end: int) -> dict:
+        """Page boundary fields for a chapter cut out of content_md[start:end]."""
+        return {
+            "page_start": data_model.page_at(start),
+            "page_breaks": data_model.page_breaks_between(start, end),
+        }
+
+    async def chunk_stream(
+        self,
+        pages: AsyncIterator[tuple[int, str]],
+        document_id: UUID | str,
+        metadata: dict,
+        outline: list[OutlineEntry],
+        toc_search_pages: int = 30,
+        max_section_chars: int = 200_000,
+    ) -> AsyncIterator[ChapterContent]:
+        """
+        Incremental counterpart of `chunk` for a stream of (page number, markdown) pages.
+        Chapters start where `chunk` starts them: at the outline's chapter bookmarks, otherwise
+        at the titles of a table of contents found within the first `toc_search_pages` pages.
+        A book with neither is split at its top-level headings instead of being kept whole.
+        A chapter is emitted as soon as the next one starts, so only the chapter being read
+        is held in memory; chapters longer than `max_section_chars` are emitted in parts.
+        """
+        base_metadata = {"document_id": document_id, **metadata}
+
+        head, toc_end = [], 0
+        split_at_headings = False
+        find_starts = self._outline_start_finder(outline)
+        if find_starts is None:
+            head, toc, toc_end = await self._read_toc(pages, toc_search_pages)
+            split_at_headings = not toc
+            find_starts = (
+                self._heading_start_finder()
+                if split_at_headings
+                else self._toc_start_finder(toc)
+            )
+
+        # Like `chunk`, a book cut at its outline or ToC drops what precedes the first
+        # chapter; one split at its headings keeps it
+        buffer = (
+            _SectionBuffer(title="Front Matter", chapter_number=None, page_start=None)
+            if split_at_headings
+            else None
+        )
+        chapter_count = 0
+        part_number = 1
+        read = 0
+
+        def _emit(buffer: _SectionBuffer, title: str) -> ChapterContent | None:
+            nonlocal chapter_count
+            raw_content = buffer.content
+            content = raw_content.strip()
+            if not content:
+                return None
+
+            # Chapters without a number of their own are counted as they are emitted
+            if buffer.chapter_number is None:
+                chapter_count += 1
+                buffer.chapter_number = chapter_count
+
+            # Keep page breaks aligned with the stripped content
+            leading = len(raw_content) - len(raw_content.lstrip())
+            return ChapterContent(
+                chapter_number=buffer.chapter_number,
+                title=title,
+                content=content,
+                metadata=base_metadata,
+                page_start=buffer.page_start,
+                page_breaks=[b - leading for b in buffer.page_breaks if b > leading],
+            )
+
+        async def _all_pages() -> AsyncIterator[tuple[int, str]]:
+            for page in head:
+                yield page
+            async for page in pages:
+                yield page
+
+        async for page_number, text in _all_pages():
+            if buffer is not None and buffer.page_start is None:
+                buffer.page_start = page_number
+
+            # The table of contents itself is never searched for chapter starts
+            skip = min(max(toc_end - read, 0), len(text))
+            read += len(text)
+
+            cursor = 0
+            for offset, title, chapter_number in find_starts(page_number, text[skip:]):
+                offset += skip
+                if buffer is not None:
+                    if offset > cursor:
+                        buffer.append(text[cursor:offset], page_break=cursor == 0)
+                    if part_number > 1:
+                        buffer.title = f"{buffer.title} (part {part_number})"
+                    if section := _emit(buffer, buffer.title):
+                        yield section
+
+                buffer = _SectionBuffer(
+                    title=title, chapter_number=chapter_number, page_start=page_number
+                )
+                part_number = 1
+                cursor = offset
+
+            if buffer is None:
+                continue
+
+            buffer.append(text[cursor:], page_break=cursor == 0)
+
+            if buffer.length > max_section_chars:
+                if section := _emit(buffer, f"{buffer.title} (part {part_number})"):
+                    yield section
+                buffer = _SectionBuffer(
+                    title=buffer.title,
+                    chapter_number=buffer.chapter_number,
+                    page_start=None,
+                )
+                part_number += 1
+
+        if buffer is not None:
+            if part_number > 1:
+                buffer.title = f"{buffer.title} (part {part_number})"
+            if section := _emit(buffer, buffer.title):
+                yield section
+
+    @staticmethod
+    async def _read_toc(
+        pages: AsyncIterator[tuple[int, str]], max_pages: int
+    ) -> tuple[list[tuple[int, str]], list[Chapter], int]:
+        """
+        Reads pages until the table of contents among them ends, at most `max_pages`, and has
+        the LLM structure it. Returns the pages read, the ToC's chapters (empty without one)
+        and the offset in the read pages' markdown where the ToC ends.
+        """
+        head = []
+        async for page in pages:
+            head.append(page)
+            text = "".join(page_text for _, page_text in head)
+            headings = HeadingIndex(text)
+
+            toc_position = headings.find_section(_TOC_TITLES, max_level=2)
+            # The ToC runs until the next heading of its own level
+            toc_end_position = (
+                headings.next_at_level(toc_position, headings.headings[toc_position].level)
+                if toc_position is not None
+                else None
+            )
+            if toc_end_position is not None:
+                toc_start = headings.headings[toc_position].offset
+                toc_end = headings.headings[toc_end_position].offset
+                toc_structured = await get_toc_from_llm(
+                    toc_text=text[toc_start:toc_end].strip()
+                )
+
+                return head, toc_structured or [], toc_end
+
+            if len(head) >= max_pages:
+                break
+
+        return head, [], 0
+
+    @staticmethod
+    def _outline_start_finder(outline: list[OutlineEntry]) -> _StartFinder | None:
+        """
+        Starts chapters at the bookmarks of the shallowest outline level with more than one
+        entry, at the matching heading on the bookmark's page or at the top of that page.
+        """
+        entries = [e for e in outline if e.page >= 1]
+        levels = sorted({e.level for e in entries})
+        level = next(
+            (lvl for lvl in levels if sum(e.level == lvl for e in entries) > 1), None
+        )
+        if level is None:
+            return None
+
+        by_page = defaultdict(list)
+        last_page = 0
+        for entry in entries:
+            # Bookmarks pointing backwards add no chapter
+            if entry.level == level and entry.page >= last_page:
+                by_page[entry.page].append(entry)
+                last_page = entry.page
+
+        def find_starts(page_number: int, text: str) -> list:
+            starts = []
+            if page_number not in by_page:
+                return starts
+
+            headings = HeadingIndex(text)
+            position = 0
+            for entry in by_page[page_number]:
+                offset = 0
+                match = headings.match(entry.title, start=position)
+                if match is not None:
+                    offset = headings.headings[match].offset
+                    position = match + 1
+
+                # Bookmarks at an already claimed spot add no chapter
+                if starts and offset <= starts[-1][0]:
+                    continue
+                starts.append((offset, entry.title.strip(), None))
+
+            return starts
+
+        return find_starts
+
+    @staticmethod
+    def _toc_start_finder(toc: list[Chapter]) -> _StartFinder:
+        """Starts chapters at headings matching the ToC titles, in ToC order."""
+        next_title = 0
+
+        def find_starts(page_number: int, text: str) -> list:
+            nonlocal next_title
+            headings = HeadingIndex(text)
+            starts = []
+            position = 0
+            while next_title < len(toc):
+                # The earliest heading matching one of the next few titles starts a chapter
+                candidates = []
+                last_title = min(next_title + _TOC_STREAM_LOOKAHEAD, len(toc))
+                for i in range(next_title, last_title):
+                    match = headings.match(
+                        toc[i].chapter_title, start=position, max_level=4
+                    )
+                    if match is not None:
+                        candidates.append((match, i))
+                if not candidates:
+                    break
+
+                match, i = min(candidates)
+                offset = headings.headings[match].offset
+                starts.append((offset, toc[i].chapter_title, toc[i].chapter_number))
+                position, next_title = match + 1, i + 1
+
+            return starts
+
+        return find_starts
+
+    @staticmethod
+    def _heading_start_finder(split_level: int = 1) -> _StartFinder:
+        """Starts a chapter at every heading of level <= `split_level`."""
+
+        def find_starts(page_number: int, text: str) -> list:
+            return [
+                (match.start(), match.group(2).strip("*_ "), None)
+                for match in HEADING_PATTERN.finditer(text)
+                if len(match.group(1)) <= split_level
+            ]
+
+        return find_starts
@@ -1,11 +1,18 @@
+import os
+import asyncio
+import multiprocessing
 from loguru import logger
 from io import BytesIO
 from pathlib import Path
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 
 from jarvis.domain.documents import ParsedDocument, DocumentSection
 from jarvis.domain.types import DataCategory
 from jarvis.domain.chunks import Chunk
 from jarvis.domain.base import VectorBaseDocument
+from jarvis.application.embedding_pool import EmbeddingWorkerPool
+from jarvis.application.embeddings import EmbeddingModelSingleton
 
 from .parsing_data_handlers import PDFParsingHandler, ParsingDataHandler
 from .chunking_data_handlers import ChunkingDataHandler, PDFChunkingHandler
@@ -29,18 +36,22 @@ class ParsingHandlerFactory:
 class ParsingDispatcher:
     factory = ParsingHandlerFactory()
 
-    @classmethod
-    def dispatch(
-        cls, data_stream: BytesIO, filename: str, metadata: dict
-    ) -> ParsedDocument:
+    @staticmethod
+    def _get_data_category(filename: str) -> DataCategory:
         file_extension = Path(filename).suffix.lower()
         # TODO: This will break if we add arxiv papers
         # or something that isn't handled by BOOKS processing logic
         if file_extension == ".pdf":
-            data_category = DataCategory.BOOKS
+            return DataCategory.BOOKS
         else:
             raise ValueError(f"Unsupported file type: {file_extension}")
 
+    @classmethod
+    def dispatch(
+        cls, data_stream: BytesIO | Path, filename: str, metadata: dict
+    ) -> ParsedDocument:
+        data_category = cls._get_data_category(filename)
+
         handler = cls.factory.create_handler(data_category=data_category)
         parsed_model = handler.parse(
             data_stream=data_stream, filename=filename, metadata=metadata
@@ -54,6 +65,208 @@ class ParsingDispatcher:
 
         return parsed_model
 
+    @classmethod
+    def dispatch_batch(
+        cls,
+        documents: list[tuple[BytesIO | Path, str, dict]],
+        max_workers: int | None = None,
+    ) -> list[ParsedDocument | None]:
+        """
+        Parses (data_stream, filename, metadata) triples in a process pool.
+        The first task of every document runs in the pool as well: it looks the document up
+        in the parse cache and splits it into shards (page ranges for PDFs). As soon as a
+        document is planned its shards join the same pool, so a single huge book doesn't
+        serialize the run and the parent never opens a document itself.
+        Results keep the input order; a document with a failed task yields None.
+        If a worker dies outright (e.g. MuPDF crashing on a corrupt file), the pool is rebuilt
+        and the interrupted tasks are resubmitted to it in parallel. Only a task that was
+        running during two crashes is retried in a process of its own, so only the culprit
+        is lost and the rest of the batch stays parallel.
+        """
+        handlers: list[ParsingDataHandler | None] = []
+        for _, filename, _ in documents:
+            try:
+                handlers.append(cls.factory.create_handler(cls._get_data_category(filename)))
+            except Exception as e:
+                logger.error(f"Failed to parse {filename}: {type(e).__name__}: {e}")
+                handlers.append(None)
+
+        failed = set(i for i, handler in enumerate(handlers) if handler is None)
+        cached_documents: dict[int, ParsedDocument] = {}
+        shard_results = [[] for _ in documents]
+
+        # A task is (document index, shard index or None for planning, entrypoint, args)
+        def _plan_task(doc_idx: int) -> tuple:
+            data_stream, filename, metadata = documents[doc_idx]
+            args = (handlers[doc_idx], data_stream, filename, metadata)
+            return doc_idx, None, _plan_in_worker, args
+
+        def _collect(task: tuple, outcome: tuple) -> list[tuple]:
+            """Records a finished task and returns the tasks it unlocks."""
+            doc_idx, shard_idx = task[0], task[1]
+            result, error = outcome
+            if error:
+                logger.error(f"Failed to parse {documents[doc_idx][1]}: {error}")
+                failed.add(doc_idx)
+                return []
+            if shard_idx is not None:
+                shard_results[doc_idx].append((shard_idx, result))
+                return []
+
+            cached, shards, planned_metadata = result
+            data_stream, filename, metadata = documents[doc_idx]
+            # The worker filled in e.g. the content hash and parse mode on its own copy
+            metadata.update(planned_metadata)
+            if cached is not None:
+                cached_documents[doc_idx] = cached
+                return []
+
+            return [
+                (
+                    doc_idx,
+                    idx,
+                    _parse_shard_in_worker,
+                    (handlers[doc_idx], data_stream, filename, metadata, shard),
+                )
+                for idx, shard in enumerate(shards)
+            ]
+
+        crashes: dict[tuple, int] = {}
+        isolated: list[tuple] = []
+
+        def _run_in_pool(tasks: list[tuple], in_flight) -> list[tuple]:
+            """
+            Runs `tasks`, and the tasks they unlock, in one pool until it is done or broken.
+            Returns the tasks a worker crash interrupted that may share a pool again.
+            """
+            interrupted, futures = [], {}
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                while tasks or futures:
+                    for task in tasks:
+                        if task[0] in failed:
+                            continue
+                        try:
+                            future = pool.submit(
+                                _run_tracked, in_flight, task[:2], task[2], *task[3]
+                            )
+                        except BrokenProcessPool:
+                            interrupted.append(task)
+                            continue
+                        futures[future] = task
+                    tasks = []
+
+                    if not futures:
+                        break
+
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        task = futures.pop(future)
+                        try:
+                            tasks.extend(_collect(task, future.result()))
+                        except BrokenProcessPool:
+                            interrupted.append(task)
+
+            # Tasks that never started are innocent; the ones still running when the worker
+            # died are suspects. If none is known to have been running, all are suspects.
+            suspects = [t for t in interrupted if t[:2] in in_flight] or interrupted
+            for task in suspects:
+                crashes[task[:2]] = crashes.get(task[:2], 0) + 1
+            in_flight.clear()
+
+            retry = []
+            for task in interrupted:
+                (isolated if crashes.get(task[:2], 0) >= 2 else retry).append(task)
+            if interrupted:
+                logger.warning(
+                    f"A parser process crashed, resubmitting {len(retry)} tasks to a new "
+                    f"pool and isolating {len(interrupted) - len(retry)}."
+                )
+
+            return retry
+
+        with multiprocessing.Manager() as manager:
+            in_flight = manager.dict()
+            pending = [_plan_task(i) for i in range(len(documents)) if i not in failed]
+            while pending or isolated:
+                while isolated:
+                    task = isolated.pop(0)
+                    if task[0] in failed:
+                        continue
+
+                    with ProcessPoolExecutor(max_workers=1) as pool:
+                        try:
+                            outcome = pool.submit(task[2], *task[3]).result()
+                        except BrokenProcessPool:
+                            outcome = None, "parser process crashed"
+
+                    # e.g. the shards of a document whose planning was isolated
+                    pending.extend(_collect(task, outcome))
+
+                if pending:
+                    pending = _run_in_pool(pending, in_flight)
+
+        results: list[ParsedDocument | None] = []
+        for doc_idx, (_, filename, metadata) in enumerate(documents):
+            if doc_idx in failed:
+                results.append(None)
+                continue
+            if doc_idx in cached_documents:
+                results.append(cached_documents[doc_idx])
+                continue
+
+            # Shards retried after a crash finish out of order
+            ordered = [
+                result
+                for _, result in sorted(shard_results[doc_idx], key=lambda r: r[0])
+            ]
+            results.append(handlers[doc_idx].assemble(filename, metadata, ordered))
+
+        return results
+
+
+def _run_tracked(in_flight, key: tuple, entrypoint, *args) -> tuple:
+    """
+    Runs a task's entrypoint while its key sits in the shared `in_flight` dict, so after a
+    worker crash the parent can tell the tasks that were running from the ones still queued.
+    """
+    in_flight[key] = os.getpid()
+    outcome = entrypoint(*args)
+    in_flight.pop(key, None)
+
+    return outcome
+
+
+def _plan_in_worker(
+    handler: ParsingDataHandler,
+    data_stream: BytesIO | Path,
+    filename: str,
+    metadata: dict,
+) -> tuple:
+    """
+    Process-pool entrypoint for a document's whole-book pass: the cache lookup, then the
+    shard plan. Returns the metadata as well, since the handler fills it in.
+    """
+    try:
+        cached = handler.load_cached(data_stream, filename, metadata)
+        shards = handler.plan_shards(data_stream, metadata) if cached is None else []
+        return (cached, shards, metadata), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def _parse_shard_in_worker(
+    handler: ParsingDataHandler,
+    data_stream: BytesIO | Path,
+    filename: str,
+    metadata: dict,
+    shard,
+) -> tuple:
+    """Process-pool entrypoint. Errors are returned as text so they always pickle."""
+    try:
+        return handler.parse_shard(data_stream, filename, metadata, shard), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
 
 class ChunkingHandlerFactory:
     @staticmethod
@@ -143,3 +356,32 @@ class EmbeddingDispatcher:
         logger.info("Data embedded successfully.", data_category=data_category)
 
         return embedded_chunk_model
+
+    @classmethod
+    async def dispatch_async(
+        cls,
+        data_model: list[VectorBaseDocument],
+        pool: EmbeddingWorkerPool | None = None,
+    ) -> list[VectorBaseDocument]:
+        """
+        Embeds a list of models without blocking the event loop: on the worker `pool` if
+        one is given, otherwise on a thread running the in-process model.
+        """
+        if len(data_model) == 0:
+            return []
+
+        data_category = data_model[0].get_category()
+        handler = cls.factory.create_handler(data_category)
+
+        texts = [model.content for model in data_model]
+        if pool is not None:
+            embeddings = await pool.embed(texts)
+            model_info = pool.model_info
+        else:
+            embedding_model = EmbeddingModelSingleton()
+            embeddings = await asyncio.to_thread(embedding_model, texts, False)
+            model_info = embedding_model.model_info()
+
+        logger.info("Data embedded successfully.", data_category=data_category)
+
+        return handler.map_batch(data_model, embeddings, model_info)
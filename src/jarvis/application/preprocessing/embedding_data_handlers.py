@@ -1,5 +1,8 @@
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar, cast
+from typing import Generic, TypeVar
+
+import numpy as np
+from numpy.typing import NDArray
 
 from jarvis.application.embeddings import EmbeddingModelSingleton
 from jarvis.domain.chunks import Chunk, PDFBookChunk
@@ -8,7 +11,6 @@ from jarvis.domain.queries import Query, EmbeddedQuery
 
 ChunkT = TypeVar("ChunkT", bound=Chunk)
 EmbeddedChunkT = TypeVar("EmbeddedChunkT", bound=EmbeddedChunk)
-embedding_model = EmbeddingModelSingleton()
 
 
 class EmbeddingDataHandler(ABC, Generic[ChunkT, EmbeddedChunkT]):
@@ -20,38 +22,53 @@ class EmbeddingDataHandler(ABC, Generic[ChunkT, EmbeddedChunkT]):
         return self.embed_batch([data_model])[0]
 
     def embed_batch(self, data_model: list[ChunkT]) -> list[EmbeddedChunkT]:
+        # Loaded on first use, so a process embedding on an EmbeddingWorkerPool never loads it
+        embedding_model = EmbeddingModelSingleton()
         embedding_model_input = [data_model.content for data_model in data_model]
-        embeddings = embedding_model(embedding_model_input, to_list=True)
+        embeddings = embedding_model(embedding_model_input, to_list=False)
+
+        return self.map_batch(data_model, embeddings, embedding_model.model_info())
 
+    def map_batch(
+        self,
+        data_model: list[ChunkT],
+        embeddings: NDArray[np.float32],
+        model_info: dict,
+    ) -> list[EmbeddedChunkT]:
+        """
+        Pairs chunks with the rows of their batch's embedding matrix, which may have been
+        computed elsewhere, e.g. by an EmbeddingWorkerPool. Chunks keep views of the rows.
+        `model_info` is the producing model's `EmbeddingModelSingleton.model_info`.
+        """
         embedded_chunk = [
-            self.map_model(data_model, cast(list[float], embedding))
+            self.map_model(data_model, embedding, model_info)
             for data_model, embedding in zip(data_model, embeddings, strict=False)
         ]
 
         return embedded_chunk
 
     @abstractmethod
-    def map_model(self, data_model: ChunkT, embedding: list[float]) -> EmbeddedChunkT:
+    def map_model(
+        self, data_model: ChunkT, embedding: NDArray[np.float32], model_info: dict
+    ) -> EmbeddedChunkT:
         pass
 
 
 class QueryEmbeddingHandler(EmbeddingDataHandler):
-    def map_model(self, data_model: Query, embedding: list[float]) -> EmbeddedQuery:
+    def map_model(
+        self, data_model: Query, embedding: NDArray[np.float32], model_info: dict
+    ) -> EmbeddedQuery:
         return EmbeddedQuery(
             id=data_model.id,
             content=data_model.content,
             embedding=embedding,
-            metadata={
-                "embedding_model_id": embedding_model.model_id,
-                "embedding_size": embedding_model.embedding_size,
-                "max_input_length": embedding_model.max_input_length,
-            },
+            metadata=model_info,
         )
 
 
 class PDFBookEmbeddingHandler(EmbeddingDataHandler):
     def map_model(
-        self, data_model: PDFBookChunk, embedding: list[float]
+        self, data_model: PDFBookChunk, embedding: NDArray[np.float32], model_info: dict
     ) -> EmbeddedPDFBookChunk:
         return EmbeddedPDFBookChunk(
             id=data_model.id,
@@ -64,8 +81,7 @@ class PDFBookEmbeddingHandler(EmbeddingDataHandler):
             book_title=data_model.book_title,
             authors=data_model.authors,
             metadata={
-                "embedding_model_id": embedding_model.model_id,
-                "embedding_size": embedding_model.embedding_size,
-                "max_input_length": embedding_model.max_input_length,
+                **data_model.metadata,
+                **model_info,
             },
         )
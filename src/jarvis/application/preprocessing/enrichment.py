@@ -0,0 +1,213 @@
+import asyncio
+
+from loguru import logger
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from jarvis.domain.books import ChapterContent, ChapterEnrichment
+from jarvis.infrastructure.llm_clients import (
+    CHARS_PER_TOKEN,
+    estimate_tokens,
+    get_chapter_enrichment_from_llm,
+    get_chapter_summaries_from_llm,
+    get_full_chapter_summary_from_llm,
+    get_packed_chapter_enrichments_from_llm,
+    merge_chapter_summaries_from_llm,
+)
+from jarvis.settings import settings
+
+
+class _PackedRequest:
+    """Short chapters waiting to be enriched together."""
+
+    def __init__(self) -> None:
+        self.chapters: list[ChapterContent] = []
+        self.futures: list[asyncio.Future] = []
+        self.tokens = 0
+
+
+class ChapterEnricher:
+    """
+    Produces the LLM enrichment (key-concept nuggets and a summary paragraph) of chapters.
+    Both fields come from one structured call; a field the combined call failed to produce
+    is requested again on its own.
+
+    Chapters above `max_input_tokens` are map-reduced: they are split into windows that are
+    enriched in parallel, their key concepts are concatenated and their partial summaries
+    merged by one more call, so no single request has to carry a whole book.
+
+    Chapters up to `pack_section_tokens` are bin-packed: calls arriving within
+    `pack_linger_seconds` of each other share one request of at most `pack_max_tokens`,
+    whose response is keyed by section. Callers still await their own chapter's result.
+    """
+
+    def __init__(
+        self,
+        max_input_tokens: int = settings.LLM_ENRICHMENT_MAX_INPUT_TOKENS,
+        pack_section_tokens: int = settings.LLM_PACK_SECTION_MAX_TOKENS,
+        pack_max_tokens: int = settings.LLM_PACK_MAX_TOKENS,
+        pack_linger_seconds: float = settings.LLM_PACK_LINGER_SECONDS,
+    ) -> None:
+        self._max_input_tokens = max_input_tokens
+        self._pack_section_tokens = pack_section_tokens
+        self._pack_max_tokens = pack_max_tokens
+        self._pack_linger_seconds = pack_linger_seconds
+        self._open_request: _PackedRequest | None = None
+        # The event loop only keeps weak references to tasks, so sent requests live here
+        self._in_flight: set[asyncio.Task] = set()
+        self._window_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=max_input_tokens * CHARS_PER_TOKEN,
+            chunk_overlap=0,
+            separators=["\n#", "\n\n", "\n", ". ", " ", ""],
+            keep_separator="start",
+        )
+
+    async def enrich(self, chapter: ChapterContent) -> ChapterEnrichment:
+        tokens = estimate_tokens(chapter.content)
+        if tokens > self._max_input_tokens:
+            return await self._map_reduce(chapter)
+
+        enrichment = None
+        if tokens <= self._pack_section_tokens:
+            enrichment = await self._enrich_packed(chapter, tokens)
+        # Also covers sections a packed response left out
+        if enrichment is None:
+            enrichment = await get_chapter_enrichment_from_llm(chapter)
+
+        return await self._fill_missing(chapter, enrichment or ChapterEnrichment())
+
+    def _enrich_packed(
+        self, chapter: ChapterContent, tokens: int
+    ) -> "asyncio.Future[ChapterEnrichment | None]":
+        """Adds a chapter to the open packed request and returns a future for its result."""
+        loop = asyncio.get_running_loop()
+
+        request = self._open_request
+        if request is not None and request.tokens + tokens > self._pack_max_tokens:
+            self._send(request)
+            request = None
+
+        if request is None:
+            request = self._open_request = _PackedRequest()
+            loop.call_later(self._pack_linger_seconds, self._send, request)
+
+        future = loop.create_future()
+        request.chapters.append(chapter)
+        request.futures.append(future)
+        request.tokens += tokens
+
+        return future
+
+    def _send(self, request: _PackedRequest) -> None:
+        if self._open_request is not request:
+            return  # Already sent because it filled up before the linger timer fired
+
+        self._open_request = None
+        task = asyncio.get_running_loop().create_task(self._run_packed(request))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _run_packed(self, request: _PackedRequest) -> None:
+        results = {}
+        try:
+            if len(request.chapters) == 1:
+                chapter = request.chapters[0]
+                results[str(chapter.id)] = await get_chapter_enrichment_from_llm(chapter)
+            else:
+                logger.debug(
+                    f"Enriching {len(request.chapters)} short chapters in one request."
+                )
+                results = await get_packed_chapter_enrichments_from_llm(request.chapters)
+        except Exception as e:
+            logger.error(f"Packed chapter enrichment failed: {e}")
+
+        # Sections missing from the response get their own call in enrich()
+        for chapter, future in zip(request.chapters, request.futures):
+            if not future.done():
+                future.set_result(results.get(str(chapter.id)))
+
+    async def _fill_missing(
+        self, chapter: ChapterContent, enrichment: ChapterEnrichment
+    ) -> ChapterEnrichment:
+        missing = _missing_fields(enrichment)
+        if not missing:
+            return enrichment
+
+        logger.warning(
+            f"Enrichment of chapter '{chapter.title}' is missing {', '.join(missing)}, "
+            "falling back to separate calls."
+        )
+
+        key_concepts, summary = await asyncio.gather(
+            (
+                get_chapter_summaries_from_llm(chapter)
+                if "key_concepts" in missing
+                else _completed(enrichment.key_concepts)
+            ),
+            (
+                get_full_chapter_summary_from_llm(chapter)
+                if "summary" in missing
+                else _completed(enrichment.summary)
+            ),
+        )
+
+        return ChapterEnrichment(key_concepts=key_concepts, summary=summary)
+
+    def _windows(self, chapter: ChapterContent) -> list[ChapterContent]:
+        texts = self._window_splitter.split_text(chapter.content)
+
+        return [
+            chapter.model_copy(
+                update={
+                    "title": f"{chapter.title} (part {i} of {len(texts)})",
+                    "content": text,
+                }
+            )
+            for i, text in enumerate(texts, start=1)
+        ]
+
+    async def _map_reduce(self, chapter: ChapterContent) -> ChapterEnrichment:
+        windows = self._windows(chapter)
+        logger.info(
+            f"Chapter '{chapter.title}' exceeds the enrichment budget, "
+            f"enriching it as {len(windows)} windows."
+        )
+
+        # Map: each window is small enough for the regular single-call path
+        partials = await asyncio.gather(*(self.enrich(window) for window in windows))
+
+        key_concepts = list(
+            dict.fromkeys(
+                concept for partial in partials for concept in partial.key_concepts
+            )
+        )
+        partial_summaries = [partial.summary for partial in partials if partial.summary]
+
+        # Reduce: one call over the partial summaries, which are far shorter than the chapter
+        summary = None
+        if len(partial_summaries) == 1:
+            summary = partial_summaries[0]
+        elif partial_summaries:
+            summary = await merge_chapter_summaries_from_llm(chapter, partial_summaries)
+            if not summary:
+                logger.warning(
+                    f"Could not merge the partial summaries of chapter '{chapter.title}', "
+                    "keeping them concatenated."
+                )
+                summary = " ".join(partial_summaries)
+
+        return ChapterEnrichment(key_concepts=key_concepts, summary=summary)
+
+
+def _missing_fields(enrichment: ChapterEnrichment) -> list[str]:
+    return [
+        field
+        for field, value in (
+            ("key_concepts", enrichment.key_concepts),
+            ("summary", enrichment.summary),
+        )
+        if not value
+    ]
+
+
+async def _completed(value):
+    return value
@@ -0,0 +1,117 @@
+import re
+from bisect import bisect_right
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.+?)\s*$", re.MULTILINE)
+
+_MARKUP = re.compile(r"[*_`\[\]]")
+_NON_WORD = re.compile(r"[^\w\s]")
+
+
+def normalize_title(text: str) -> str:
+    """Lowercases a title and drops markdown emphasis, punctuation and repeated whitespace."""
+    text = _NON_WORD.sub(" ", _MARKUP.sub("", text))
+    return " ".join(text.split()).casefold()
+
+
+@dataclass(frozen=True)
+class Heading:
+    offset: int  # Start of the heading line in the markdown
+    level: int
+    title: str
+    normalized_title: str
+
+
+class HeadingIndex:
+    """
+    Every markdown heading of a document, collected in a single scan.
+    Titles (e.g. TOC entries) are looked up against the index instead of being searched
+    for in the full text, so splitting a book costs one pass over the markdown.
+    """
+
+    def __init__(self, md_text: str) -> None:
+        self.headings = [
+            Heading(
+                offset=match.start(),
+                level=len(match.group(1)),
+                title=match.group(2).strip("*_ "),
+                normalized_title=normalize_title(match.group(2)),
+            )
+            for match in HEADING_PATTERN.finditer(md_text)
+        ]
+        self._offsets = [heading.offset for heading in self.headings]
+
+    def __len__(self) -> int:
+        return len(self.headings)
+
+    def position_after(self, offset: int) -> int:
+        """Index of the first heading that starts after `offset`."""
+        return bisect_right(self._offsets, offset)
+
+    def find_section(self, titles: set[str], max_level: int) -> int | None:
+        """Index of the first heading of level <= `max_level` whose normalized title is in `titles`."""
+        for i, heading in enumerate(self.headings):
+            if heading.level <= max_level and heading.normalized_title in titles:
+                return i
+
+        return None
+
+    def next_at_level(self, position: int, level: int) -> int | None:
+        """Index of the next heading after `position` with exactly the given level."""
+        for i in range(position + 1, len(self.headings)):
+            if self.headings[i].level == level:
+                return i
+
+        return None
+
+    def match(
+        self,
+        title: str,
+        start: int = 0,
+        max_level: int = 6,
+        min_similarity: float = 0.8,
+        lookahead: int = 8,
+        end: int | None = None,
+    ) -> int | None:
+        """
+        Index of the heading at or after position `start`, and before position `end` if given,
+        that best matches `title`. Bounding the scan keeps titles that match nothing cheap.
+        An exact normalized match wins immediately. Otherwise headings that contain the title
+        (e.g. "Chapter 3: Title" for "Title") or are at least `min_similarity` similar
+        qualify; the most similar one within `lookahead` headings of the first candidate,
+        earliest on ties, is returned.
+        """
+        wanted = normalize_title(title)
+        if not wanted:
+            return None
+
+        matcher = SequenceMatcher(b=wanted, autojunk=False)
+        best, best_score = None, 0.0
+        end = len(self.headings) if end is None else min(end, len(self.headings))
+        for i in range(start, end):
+            if best is not None and i > best + lookahead:
+                break
+
+            heading = self.headings[i]
+            if heading.level > max_level:
+                continue
+
+            candidate = heading.normalized_title
+            if candidate == wanted:
+                return i
+
+            if wanted in candidate:
+                score = 0.95
+            else:
+                matcher.set_seq1(candidate)
+                if matcher.real_quick_ratio() < min_similarity:
+                    continue
+                if matcher.quick_ratio() < min_similarity:
+                    continue
+                score = matcher.ratio()
+
+            if score >= min_similarity and score > best_score:
+                best, best_score = i, score
+
+        return best
@@ -1,10 +1,20 @@
+import json
+import zlib
+import hashlib
 from loguru import logger
 from abc import ABC, abstractmethod
 from io import BytesIO
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
 import pymupdf
 import pymupdf4llm
+from pymupdf4llm.helpers.pymupdf_rag import IdentifyHeaders
 
-from jarvis.domain.books import ParsedBookDocument
+from jarvis.domain.books import ParsedBookDocument, OutlineEntry
+from jarvis.infrastructure.cache import PersistentCache, make_cache_key
+from jarvis.infrastructure.downloads import sha256_file
+from jarvis.settings import settings
 
 
 class ParsingDataHandler(ABC):
@@ -12,20 +22,470 @@ class ParsingDataHandler(ABC):
 
     @abstractmethod
     def parse(
-        self, data_stream: BytesIO, filename: str, metadata: dict
+        self, data_stream: BytesIO | Path, filename: str, metadata: dict
     ) -> ParsedBookDocument:
         pass
 
+    def load_cached(
+        self, data_stream: BytesIO | Path, filename: str, metadata: dict
+    ) -> ParsedBookDocument | None:
+        """Returns a previously parsed version of this exact document, if the handler caches."""
+        return None
+
+    def plan_shards(self, data_stream: BytesIO | Path, metadata: dict) -> list:
+        """
+        Splits a document into units that can be parsed independently, e.g. in separate processes.
+        By default the whole document is a single shard.
+        """
+        return [None]
+
+    def parse_shard(
+        self, data_stream: BytesIO | Path, filename: str, metadata: dict, shard
+    ):
+        return self.parse(data_stream, filename, metadata)
+
+    def assemble(self, filename: str, metadata: dict, shard_results: list):
+        """Stitches shard results (in shard order) back into one parsed document."""
+        return shard_results[0]
+
+
+def _open_pdf(data_stream: BytesIO | Path) -> pymupdf.Document:
+    # A path lets MuPDF read the spilled file lazily instead of copying it into memory
+    if isinstance(data_stream, Path):
+        return pymupdf.open(data_stream, filetype="pdf")
+
+    return pymupdf.open(stream=data_stream, filetype="pdf")
+
+
+def _content_sha256(data_stream: BytesIO | Path) -> str:
+    if isinstance(data_stream, Path):
+        return sha256_file(data_stream)
+
+    return hashlib.sha256(data_stream.getbuffer()).hexdigest()
+
+
+# Sampled pages with more vector drawings than this most likely contain tables or figures
+_MAX_DRAWINGS_PER_SIMPLE_PAGE = 20
+# Share of sampled pages that may look complex before the whole book gets full layout analysis
+_MAX_COMPLEX_PAGE_SHARE = 0.2
+
+
+def _normalize_title(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+def _is_multi_column(page: pymupdf.Page) -> bool:
+    """Detects text blocks sitting side by side in both halves of the page."""
+    middle = page.rect.x0 + page.rect.width / 2
+    left = right = 0
+    for x0, _, x1, _, text, _, block_type in page.get_text("blocks"):
+        if block_type != 0 or not text.strip():
+            continue
+        if x1 <= middle:
+            left += 1
+        elif x0 >= middle:
+            right += 1
+
+    return left >= 2 and right >= 2
+
+
+def _sample_pages(doc: pymupdf.Document, sample_pages: int) -> list[int]:
+    """Up to `sample_pages` evenly spaced 0-based page numbers."""
+    step = max(doc.page_count / sample_pages, 1)
+    return sorted({int(i * step) for i in range(min(sample_pages, doc.page_count))})
+
+
+def _detect_parse_mode(doc: pymupdf.Document, sample_pages: int) -> str:
+    """
+    Picks "fast" or "full" extraction for a document from an evenly spaced page sample.
+    Pages with many vector drawings (tables, diagrams) or multiple text columns need
+    pymupdf4llm's layout analysis; plain prose reads fine with simple text extraction.
+    """
+    if doc.page_count == 0:
+        return "fast"
+
+    sampled = _sample_pages(doc, sample_pages)
+
+    complex_pages = 0
+    for page_number in sampled:
+        page = doc.load_page(page_number)
+        if len(page.get_drawings()) > _MAX_DRAWINGS_PER_SIMPLE_PAGE or _is_multi_column(page):
+            complex_pages += 1
+
+    return "full" if complex_pages / len(sampled) > _MAX_COMPLEX_PAGE_SHARE else "fast"
+
+
+def _outline_headings(doc: pymupdf.Document) -> dict[int, dict[str, int]]:
+    """Maps 0-based page numbers to {normalized outline title: heading level}."""
+    headings: dict[int, dict[str, int]] = {}
+    for level, title, page in doc.get_toc(simple=True):
+        if page >= 1 and title.strip():
+            headings.setdefault(page - 1, {})[_normalize_title(title)] = min(level, 6)
+
+    return headings
+
+
+def _fast_page_markdown(
+    page: pymupdf.Page, hdr_info: IdentifyHeaders | None, outline: dict[str, int]
+) -> str:
+    """
+    Builds markdown for a page from plain text extraction.
+    Lines matching an outline entry for this page become headings at the outline's level;
+    otherwise, given `hdr_info`, larger-than-body font sizes map to heading levels like in
+    full mode.
+    """
+    parts = []
+    blocks = page.get_text("dict", flags=pymupdf.TEXTFLAGS_TEXT, sort=True)["blocks"]
+    for block in blocks:
+        paragraph = []
+        for line in block["lines"]:
+            spans = [span for span in line["spans"] if span["text"].strip()]
+            if not spans:
+                continue
+
+            text = " ".join("".join(span["text"] for span in line["spans"]).split())
+            level = outline.get(_normalize_title(text))
+            if level:
+                prefix = "#" * level + " "
+            elif hdr_info is not None:
+                prefix = max((hdr_info.get_header_id(span) for span in spans), key=len)
+            else:
+                prefix = ""
+            if not prefix:
+                paragraph.append(text)
+                continue
+
+            if paragraph:
+                parts.append("\n".join(paragraph))
+                paragraph = []
+            parts.append(prefix + text)
+
+        if paragraph:
+            parts.append("\n".join(paragraph))
+
+    return "\n\n".join(parts) + "\n\n" if parts else ""
+
+
+def _page_markdown(
+    doc: pymupdf.Document,
+    pages: list[int],
+    mode: str,
+    hdr_info: IdentifyHeaders | None,
+    outline: dict[int, dict[str, int]],
+) -> list[str]:
+    if mode == "fast":
+        return [
+            _fast_page_markdown(doc.load_page(p), hdr_info, outline.get(p, {}))
+            for p in pages
+        ]
+
+    page_chunks = pymupdf4llm.to_markdown(
+        doc, pages=pages, hdr_info=hdr_info, page_chunks=True
+    )
+    return [page_chunk["text"] for page_chunk in page_chunks]
+
+
+class _CacheEntryWriter:
+    """
+    Builds the parse cache entry of a streamed book page by page, compressing each page as it
+    arrives, so writing the entry doesn't need the whole book's markdown in memory at the end.
+    """
+
+    def __init__(self, parse_mode: str, outline: list) -> None:
+        self._compressor = zlib.compressobj()
+        head = json.dumps({"parse_mode": parse_mode, "outline": outline})
+        self._parts = [self._compressor.compress(f'{head[:-1]}, "page_texts": ['.encode())]
+        self._separator = ""
+
+    def add_page(self, text: str) -> None:
+        self._parts.append(
+            self._compressor.compress((self._separator + json.dumps(text)).encode())
+        )
+        self._separator = ", "
+
+    def finish(self) -> bytes:
+        self._parts.append(self._compressor.compress(b"]}"))
+        self._parts.append(self._compressor.flush())
+
+        return b"".join(self._parts)
+
 
 class PDFParsingHandler(ParsingDataHandler):
-    """Specific handler for parsing PDFs"""
+    """
+    Specific handler for parsing PDFs.
+    Books longer than `shard_pages` are split into page ranges that are converted
+    independently and stitched back together in page order.
+    Converted pages are cached on disk by content hash, library versions and parser options.
 
-    def parse(
-        self, data_stream: BytesIO, filename: str, metadata: dict
+    `mode` picks the extraction path: "full" runs pymupdf4llm's layout analysis, "fast"
+    uses plain text extraction with headings from font sizes and the PDF outline, and
+    "auto" samples pages to choose per document. The chosen mode lands in metadata["parse_mode"].
+    """
+
+    def __init__(
+        self,
+        shard_pages: int = settings.PARSE_SHARD_PAGES,
+        max_workers: int = 1,
+        use_cache: bool = settings.PARSE_CACHE_ENABLED,
+        mode: str = settings.PARSE_MODE,
+    ) -> None:
+        if mode not in ("auto", "fast", "full"):
+            raise ValueError(f"Unknown parse mode: {mode}")
+
+        self._mode = mode
+        self._shard_pages = shard_pages
+        self._max_workers = max_workers
+        self._cache = (
+            PersistentCache(
+                Path(settings.INGESTION_CACHE_DIR) / "parse_cache.sqlite3",
+                max_bytes=settings.PARSE_CACHE_MAX_BYTES,
+            )
+            if use_cache
+            else None
+        )
+
+    @property
+    def options(self) -> dict:
+        """Everything besides the input bytes that changes the produced markdown."""
+        return {
+            # Bumped whenever the cached value's layout changes; 2 added the PDF outline
+            "format_version": 2,
+            "page_chunks": True,
+            "header_detection": "font_size",
+            "mode": self._mode,
+            "fast_header_sample_pages": settings.PARSE_FAST_HEADER_SAMPLE_PAGES
+            if self._mode != "full"
+            else None,
+            "auto_sample_pages": settings.PARSE_AUTO_SAMPLE_PAGES
+            if self._mode == "auto"
+            else None,
+        }
+
+    def _cache_key(self, content_sha256: str, streamed: bool = False) -> str:
+        options = self.options
+        if streamed:
+            # Streamed books take full mode's heading levels from a page sample as well
+            options = {
+                **options,
+                "full_header_sample_pages": settings.PARSE_STREAM_HEADER_SAMPLE_PAGES,
+            }
+
+        return make_cache_key(
+            "pdf_markdown",
+            content_sha256,
+            pymupdf.VersionBind,
+            pymupdf4llm.version,
+            options,
+        )
+
+    def load_cached(
+        self, data_stream: BytesIO | Path, filename: str, metadata: dict
+    ) -> ParsedBookDocument | None:
+        if self._cache is None:
+            return None
+
+        # The hash is also what assemble() stores the result under
+        if not metadata.get("content_sha256"):
+            metadata["content_sha256"] = _content_sha256(data_stream)
+
+        cached = self._cache.get_json(self._cache_key(metadata["content_sha256"]))
+        if cached is None:
+            return None
+
+        logger.info(f"Using cached markdown for {filename}.")
+        metadata["parse_mode"] = cached["parse_mode"]
+
+        return self._build_document(
+            filename, metadata, cached["page_texts"], cached["outline"]
+        )
+
+    def _resolve_mode(self, doc: pymupdf.Document, filename: str | None = None) -> str:
+        if self._mode != "auto":
+            return self._mode
+
+        mode = _detect_parse_mode(doc, settings.PARSE_AUTO_SAMPLE_PAGES)
+        logger.info(f"Using {mode} extraction for {filename or 'document'}.")
+
+        return mode
+
+    def _plan(
+        self,
+        doc: pymupdf.Document,
+        metadata: dict,
+        full_header_sample_pages: int | None = None,
+    ) -> tuple:
+        """
+        Resolves the extraction mode and the header info shared by every shard.
+        With `full_header_sample_pages` full mode reads font sizes from a page sample instead
+        of the whole book.
+        """
+        mode = self._resolve_mode(doc, metadata.get("source_file"))
+        metadata["parse_mode"] = mode
+        if mode == "full":
+            # Header levels are derived from font sizes across the book once, so every
+            # shard maps the same font size to the same markdown heading level
+            if full_header_sample_pages is None:
+                return mode, IdentifyHeaders(doc), {}
+
+            pages = _sample_pages(doc, full_header_sample_pages)
+            return mode, IdentifyHeaders(doc, pages=pages), {}
+
+        # Fast mode skips the whole-book font statistics pass: the outline names the
+        # headings if there is one, otherwise font sizes come from a page sample
+        outline = _outline_headings(doc)
+        hdr_info = (
+            None
+            if outline
+            else IdentifyHeaders(
+                doc, pages=_sample_pages(doc, settings.PARSE_FAST_HEADER_SAMPLE_PAGES)
+            )
+        )
+
+        return mode, hdr_info, outline
+
+    def plan_shards(self, data_stream: BytesIO | Path, metadata: dict) -> list:
+        """Returns (page range, mode, header info, outline headings) shards."""
+        with _open_pdf(data_stream) as doc:
+            mode, hdr_info, outline = self._plan(doc, metadata)
+            page_count = doc.page_count
+
+        shards = []
+        for start in range(0, max(page_count, 1), self._shard_pages):
+            pages = range(start, min(start + self._shard_pages, page_count))
+            shard_outline = {p: outline[p] for p in pages if p in outline}
+            shards.append((pages, mode, hdr_info, shard_outline))
+
+        return shards
+
+    def parse_shard(
+        self, data_stream: BytesIO | Path, filename: str, metadata: dict, shard
+    ) -> tuple[list[str], list]:
+        """
+        Converts one page range into a list of per-page markdown strings.
+        The shard starting at the first page also returns the PDF outline as
+        [level, title, page] entries.
+        """
+        pages, mode, hdr_info, outline = shard
+        with _open_pdf(data_stream) as doc:
+            if doc.page_count == 0:
+                return [], []
+
+            toc = doc.get_toc(simple=True) if pages.start == 0 else []
+            return _page_markdown(doc, list(pages), mode, hdr_info, outline), toc
+
+    def assemble(
+        self, filename: str, metadata: dict, shard_results: list[tuple[list[str], list]]
     ) -> ParsedBookDocument:
-        doc = pymupdf.open(stream=data_stream, filetype="pdf")
-        md_text = pymupdf4llm.to_markdown(doc)
+        page_texts = [text for shard_pages, _ in shard_results for text in shard_pages]
+        toc = [entry for _, shard_toc in shard_results for entry in shard_toc]
+
+        if self._cache is not None and metadata.get("content_sha256"):
+            self._cache.set_json(
+                self._cache_key(metadata["content_sha256"]),
+                {
+                    "parse_mode": metadata.get("parse_mode"),
+                    "page_texts": page_texts,
+                    "outline": toc,
+                },
+            )
+
+        return self._build_document(filename, metadata, page_texts, toc)
+
+    @staticmethod
+    def _build_document(
+        filename: str, metadata: dict, page_texts: list[str], toc: list
+    ) -> ParsedBookDocument:
+        page_breaks = []
+        offset = 0
+        for text in page_texts:
+            page_breaks.append(offset)
+            offset += len(text)
 
         return ParsedBookDocument(
-            source_filename=filename, content_md=md_text, metadata=metadata
+            source_filename=filename,
+            content_md="".join(page_texts),
+            page_breaks=page_breaks,
+            outline=[
+                OutlineEntry(level=level, title=title, page=page)
+                for level, title, page in toc
+            ],
+            metadata=metadata,
         )
+
+    def read_outline(self, data_stream: BytesIO | Path) -> list[OutlineEntry]:
+        """The PDF's bookmark outline, read without converting any page."""
+        with _open_pdf(data_stream) as doc:
+            return [
+                OutlineEntry(level=level, title=title, page=page)
+                for level, title, page in doc.get_toc(simple=True)
+            ]
+
+    def iter_pages(
+        self, data_stream: BytesIO | Path, metadata: dict, batch_pages: int = 4
+    ) -> Iterator[tuple[int, str]]:
+        """
+        Yields (1-based page number, markdown) in page order while the book is being converted,
+        so consumers can start before the last page is parsed.
+        At most `batch_pages` pages of markdown are held at once. Heading levels come from a
+        page sample in every mode, so the first page doesn't wait for a pass over the whole book.
+        A fully consumed stream is written to the parse cache, apart from `parse` results.
+        """
+        key = None
+        if self._cache is not None:
+            if not metadata.get("content_sha256"):
+                metadata["content_sha256"] = _content_sha256(data_stream)
+
+            key = self._cache_key(metadata["content_sha256"], streamed=True)
+            cached = self._cache.get_json(key)
+            if cached is not None:
+                logger.info(f"Using cached markdown for {metadata.get('source_file')}.")
+                metadata["parse_mode"] = cached["parse_mode"]
+                yield from enumerate(cached["page_texts"], start=1)
+                return
+
+        with _open_pdf(data_stream) as doc:
+            mode, hdr_info, outline = self._plan(
+                doc,
+                metadata,
+                full_header_sample_pages=settings.PARSE_STREAM_HEADER_SAMPLE_PAGES,
+            )
+            entry = _CacheEntryWriter(mode, doc.get_toc(simple=True)) if key else None
+
+            for start in range(0, doc.page_count, batch_pages):
+                pages = list(range(start, min(start + batch_pages, doc.page_count)))
+                page_texts = _page_markdown(doc, pages, mode, hdr_info, outline)
+
+                for page_number, text in zip(pages, page_texts):
+                    if entry is not None:
+                        entry.add_page(text)
+                    yield page_number + 1, text
+
+        if entry is not None:
+            self._cache.set_compressed(key, entry.finish())
+
+    def parse(
+        self, data_stream: BytesIO | Path, filename: str, metadata: dict
+    ) -> ParsedBookDocument:
+        cached = self.load_cached(data_stream, filename, metadata)
+        if cached is not None:
+            return cached
+
+        shards = self.plan_shards(data_stream, metadata)
+
+        if self._max_workers > 1 and len(shards) > 1:
+            logger.info(f"Parsing {filename} as {len(shards)} page-range shards.")
+            with ProcessPoolExecutor(max_workers=self._max_workers) as pool:
+                futures = [
+                    pool.submit(
+                        self.parse_shard, data_stream, filename, metadata, shard
+                    )
+                    for shard in shards
+                ]
+                shard_results = [future.result() for future in futures]
+        else:
+            shard_results = [
+                self.parse_shard(data_stream, filename, metadata, shard)
+                for shard in shards
+            ]
+
+        return self.assemble(filename, metadata, shard_results)
@@ -2,6 +2,7 @@ import uuid
 import asyncio
 from pydantic import BaseModel
 from abc import ABC, abstractmethod
+from typing import AsyncIterator
 
 from langchain_text_splitters import (
     MarkdownHeaderTextSplitter,
@@ -11,11 +12,9 @@ from langchain_text_splitters import (
 from jarvis.domain.chunks import Chunk, PDFBookChunk
 from jarvis.domain.documents import DocumentSection, ParsedDocument
 from jarvis.domain.books import ChapterContent, BookMetadata
-from jarvis.infrastructure.llm_clients import (
-    get_chapter_summaries_from_llm,
-    get_full_chapter_summary_from_llm,
-    get_metadata_from_llm,
-)
+from jarvis.infrastructure.llm_clients import get_metadata_from_llm
+
+from .enrichment import ChapterEnricher
 
 
 class DocumentSectionProcessor(ABC):
@@ -51,22 +50,77 @@ class BookChapterProcessor(DocumentSectionProcessor):
             separators=["\n\n", "\n", ".", " ", ""],
         )
 
+        self.enricher = ChapterEnricher()
+
+    # How much of the start of a book is shown to the LLM to find its metadata
+    metadata_snippet_chars = 9000
+
     async def extract_document_metadata(self, document):
-        snippet = document.content_md[:9000]
+        snippet = document.content_md[: self.metadata_snippet_chars]
+        return await self.extract_metadata_from_snippet(snippet)
+
+    async def extract_metadata_from_snippet(self, snippet: str) -> BookMetadata | None:
         return await get_metadata_from_llm(snippet)
 
+    async def process_stream(
+        self,
+        chapters: AsyncIterator[ChapterContent],
+        book_metadata: BookMetadata,
+        doc_id: uuid.UUID,
+        max_in_flight: int = 4,
+        return_exceptions: bool = False,
+    ) -> AsyncIterator[tuple[ChapterContent, list[PDFBookChunk] | BaseException]]:
+        """
+        Processes chapters as they arrive from a stream and yields (chapter, chunks) as each
+        one finishes. At most `max_in_flight` chapters are processed at once; beyond that the
+        stream is not consumed further, which applies backpressure all the way to the parser.
+        With `return_exceptions` a failed chapter is yielded with its exception instead of
+        ending the stream, like `asyncio.gather`.
+        """
+
+        async def _process(chapter: ChapterContent):
+            try:
+                return chapter, await self.process(chapter, book_metadata, doc_id)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                return chapter, e
+
+        pending = set()
+        try:
+            async for chapter in chapters:
+                pending.add(asyncio.create_task(_process(chapter)))
+
+                if len(pending) >= max_in_flight:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        yield task.result()
+
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    yield task.result()
+        finally:
+            # A consumer that stops early leaves no chapter running in the background
+            for task in pending:
+                task.cancel()
+
     async def process(
         self, chapter: ChapterContent, book_metadata: BookMetadata, doc_id: uuid.UUID
     ) -> list[PDFBookChunk]:
         """Generates all final chunks for a single chapter"""
         final_chunks = []
 
-        # LLM calls for summaries
-        summary_task = get_chapter_summaries_from_llm(chapter)
-        full_summary_task = get_full_chapter_summary_from_llm(chapter)
+        # LLM call for key concepts and summary
+        enrichment_task = asyncio.create_task(self.enricher.enrich(chapter))
 
         # Split by header
         semantic_chunks = self.markdown_splitter.split_text(chapter.content)
+        cursor = 0
 
         for semantic_chunk in semantic_chunks:
             header_metadata = semantic_chunk.metadata  # {header level, title}
@@ -81,6 +135,13 @@ class BookChapterProcessor(DocumentSectionProcessor):
                     "chunk_source": "hierarchical_text",
                 }
 
+                # Splitters normalize whitespace, so locate the chunk by its first line
+                first_line = sub_chunk.strip().split("\n", 1)[0].strip()[:64]
+                offset = chapter.content.find(first_line, cursor)
+                if offset >= 0:
+                    cursor = offset
+                    combined_metadata["page"] = chapter.page_at(offset)
+
                 final_chunks.append(
                     PDFBookChunk(
                         content=sub_chunk,
@@ -95,8 +156,8 @@ class BookChapterProcessor(DocumentSectionProcessor):
                 )
 
         # Await LLM results
-        results = await asyncio.gather(summary_task, full_summary_task)
-        summaries, full_summary = results
+        enrichment = await enrichment_task
+        summaries, full_summary = enrichment.key_concepts, enrichment.summary
 
         # Add Summary Nuggets
         if summaries:
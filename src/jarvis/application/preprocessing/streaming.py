@@ -0,0 +1,124 @@
+import uuid
+import asyncio
+import threading
+from io import BytesIO
+from pathlib import Path
+from typing import AsyncIterator, Generator
+
+from jarvis.domain.books import ChapterContent
+
+from .parsing_data_handlers import PDFParsingHandler
+from .chunking_data_handlers import PDFChunkingHandler
+
+_END = object()
+
+
+async def _iterate_in_thread(iterator: Generator, max_buffered: int) -> AsyncIterator:
+    """
+    Drives a blocking generator in a background thread.
+    The thread blocks once `max_buffered` items are waiting, so a slow consumer
+    throttles the producer instead of letting items pile up in memory.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffered)
+    cancelled = threading.Event()
+
+    def _produce() -> None:
+        try:
+            for item in iterator:
+                if cancelled.is_set():
+                    return
+                asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+        except Exception as e:
+            asyncio.run_coroutine_threadsafe(queue.put(e), loop).result()
+        finally:
+            # Closes the iterator in its own thread, so an abandoned book skips its cache write
+            iterator.close()
+            asyncio.run_coroutine_threadsafe(queue.put(_END), loop).result()
+
+    producer = loop.run_in_executor(None, _produce)
+    try:
+        while (item := await queue.get()) is not _END:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        cancelled.set()
+        # Unblock the producer if it is waiting on a full queue
+        while not producer.done():
+            while not queue.empty():
+                queue.get_nowait()
+            await asyncio.sleep(0.01)
+
+
+async def _prepend(items: list, rest: AsyncIterator) -> AsyncIterator:
+    for item in items:
+        yield item
+    async for item in rest:
+        yield item
+
+
+class BookStream:
+    """
+    A PDF book converted page by page in a background thread and cut into chapters as its
+    pages arrive. At most `max_buffered_pages` converted pages wait for the chunker, so a book
+    in flight holds its current chapter and a few pages instead of its whole markdown.
+    Use it as an async context manager; leaving it early stops the conversion.
+    """
+
+    def __init__(
+        self,
+        data_stream: BytesIO | Path,
+        metadata: dict,
+        document_id: uuid.UUID,
+        max_buffered_pages: int = 16,
+    ) -> None:
+        self._data_stream = data_stream
+        self._metadata = metadata
+        self._document_id = document_id
+        self._max_buffered_pages = max_buffered_pages
+        self._parser = PDFParsingHandler()
+        self._chunker = PDFChunkingHandler()
+        self._outline = []
+        self._pages: AsyncIterator[tuple[int, str]] | None = None
+        self._head: list[tuple[int, str]] = []
+
+    async def __aenter__(self) -> "BookStream":
+        self._outline = await asyncio.to_thread(
+            self._parser.read_outline, self._data_stream
+        )
+        self._pages = _iterate_in_thread(
+            self._parser.iter_pages(self._data_stream, self._metadata),
+            max_buffered=self._max_buffered_pages,
+        )
+
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._pages.aclose()
+
+    async def read_head(self, max_chars: int) -> str:
+        """
+        The book's opening markdown, up to `max_chars`, e.g. for its metadata.
+        The pages read stay queued for `chapters`.
+        """
+        head_length = sum(len(text) for _, text in self._head)
+        if head_length < max_chars:
+            async for page in self._pages:
+                self._head.append(page)
+                head_length += len(page[1])
+                if head_length >= max_chars:
+                    break
+
+        return "".join(text for _, text in self._head)[:max_chars]
+
+    def chapters(self) -> AsyncIterator[ChapterContent]:
+        """The book's chapters, each emitted as soon as the next one starts."""
+        head, self._head = self._head, []
+
+        return self._chunker.chunk_stream(
+            _prepend(head, self._pages),
+            document_id=self._document_id,
+            metadata=self._metadata,
+            outline=self._outline,
+        )
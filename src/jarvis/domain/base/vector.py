@@ -8,7 +8,7 @@ from loguru import logger
 from pydantic import UUID4, BaseModel, Field
 from qdrant_client.http import exceptions
 from qdrant_client.http.models import Distance, VectorParams
-from qdrant_client.models import CollectionInfo, PointStruct, Record
+from qdrant_client.models import CollectionInfo, PointIdsList, PointStruct, Record
 
 from jarvis.infrastructure.vector_db_client import connection
 from jarvis.application.embeddings import EmbeddingModelSingleton
@@ -55,7 +55,7 @@ class VectorBaseDocument(BaseModel, Generic[T], ABC):
 
         _id = str(payload.pop("id"))
         vector = payload.pop("embedding", {})
-        if vector and isinstance(vector, np.ndarray):
+        if isinstance(vector, np.ndarray):
             vector = vector.tolist()
 
         return PointStruct(id=_id, vector=vector, payload=payload)
@@ -102,9 +102,40 @@ class VectorBaseDocument(BaseModel, Generic[T], ABC):
 
     @classmethod
     def _bulk_insert(cls: Type[T], documents: list["VectorBaseDocument"]) -> None:
-        points = [doc.to_point() for doc in documents]
+        if not cls._has_class_attribute("embedding"):
+            points = [doc.to_point() for doc in documents]
+            connection.upsert(collection_name=cls.get_collection_name(), points=points)
+            return
+
+        # Vectors go to Qdrant as one float32 matrix instead of per-point float lists
+        payloads = [doc.model_dump(exclude={"embedding"}) for doc in documents]
+        ids = [str(payload.pop("id")) for payload in payloads]
+        vectors = np.stack([doc.embedding for doc in documents])
+
+        connection.upload_collection(
+            collection_name=cls.get_collection_name(),
+            vectors=vectors,
+            payload=payloads,
+            ids=ids,
+            batch_size=len(documents),
+            max_retries=1,
+            wait=True,
+        )
+
+    @classmethod
+    def bulk_delete(cls: Type[T], ids: list[UUID]) -> bool:
+        try:
+            connection.delete(
+                collection_name=cls.get_collection_name(),
+                points_selector=PointIdsList(points=[str(_id) for _id in ids]),
+            )
+        except exceptions.UnexpectedResponse:
+            logger.error(
+                f"Failed to delete documents from '{cls.get_collection_name()}'."
+            )
+            return False
 
-        connection.upsert(collection_name=cls.get_collection_name(), points=points)
+        return True
 
     @classmethod
     def bulk_find(
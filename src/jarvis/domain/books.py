@@ -1,3 +1,5 @@
+from bisect import bisect_right
+
 from pydantic import BaseModel, Field
 
 
@@ -6,10 +8,33 @@ from .types import DataCategory
 from .base import VectorBaseDocument
 
 
+class OutlineEntry(BaseModel):
+    """A bookmark from the PDF's embedded outline."""
+
+    level: int
+    title: str
+    page: int  # 1-based target page
+
+
 class ParsedBookDocument(ParsedDocument):
     """A parsed document originating from a PDF book file."""
 
     category: DataCategory = DataCategory.BOOKS
+    page_breaks: list[int] = Field(
+        default_factory=list
+    )  # Offset in content_md where each page starts
+    outline: list[OutlineEntry] = Field(default_factory=list)
+
+    def page_at(self, offset: int) -> int | None:
+        """Returns the 1-based page number containing the given offset of content_md."""
+        if not self.page_breaks:
+            return None
+
+        return max(bisect_right(self.page_breaks, offset), 1)
+
+    def page_breaks_between(self, start: int, end: int) -> list[int]:
+        """Page breaks strictly inside content_md[start:end], relative to `start`."""
+        return [offset - start for offset in self.page_breaks if start < offset < end]
 
 
 class Chapter(BaseModel):
@@ -26,6 +51,30 @@ class ChapterContent(DocumentSection):
 
     chapter_number: int | str
     category: DataCategory = DataCategory.BOOKS
+    page_start: int | None = None
+    page_breaks: list[int] = Field(
+        default_factory=list
+    )  # Offsets in content where each following page starts
+
+    def page_at(self, offset: int) -> int | None:
+        """Returns the 1-based book page containing the given offset of content."""
+        if self.page_start is None:
+            return None
+
+        return self.page_start + bisect_right(self.page_breaks, offset)
+
+
+class ChapterEnrichment(BaseModel):
+    """LLM-generated knowledge extracted from one chapter."""
+
+    key_concepts: list[str] = Field(default_factory=list)
+    summary: str | None = None
+
+
+class SectionEnrichment(ChapterEnrichment):
+    """Enrichment of one section out of several sent in a single request."""
+
+    section_id: str
 
 
 class BookMetadata(BaseModel):
@@ -39,6 +88,7 @@ class StoredChapter(StoredDocument):
 
     title: str
     chapter_number: int | str
+    page_start: int | None = None
 
     class Config:
         name = "book_chapters"
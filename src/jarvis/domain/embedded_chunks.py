@@ -3,7 +3,7 @@ from pydantic import Field, UUID4
 from typing import Optional
 
 from jarvis.domain.base import VectorBaseDocument
-from jarvis.domain.types import DataCategory
+from jarvis.domain.types import DataCategory, Embedding
 
 
 class EmbeddedChunk(VectorBaseDocument, ABC):
@@ -11,7 +11,7 @@ class EmbeddedChunk(VectorBaseDocument, ABC):
 
     content: str
     document_id: UUID4  # The id of the ParsedBookDocument it came from
-    embedding: list[float]
+    embedding: Embedding
     parent_id: Optional[UUID4] = None  # Optional field for parent-child relationships
     metadata: dict = Field(default_factory=dict)
 
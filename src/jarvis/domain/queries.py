@@ -1,7 +1,7 @@
 from pydantic import Field
 
 from jarvis.domain.base import VectorBaseDocument
-from jarvis.domain.types import DataCategory
+from jarvis.domain.types import DataCategory, Embedding
 
 
 class Query(VectorBaseDocument):
@@ -26,7 +26,7 @@ class Query(VectorBaseDocument):
 class EmbeddedQuery(Query):
     """Represents a query after embedding."""
 
-    embedding: list[float]
+    embedding: Embedding
 
     class Config:
         category = DataCategory.QUERIES
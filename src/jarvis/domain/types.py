@@ -1,4 +1,28 @@
 from enum import StrEnum
+from typing import Annotated
+
+import numpy as np
+from pydantic import PlainSerializer, PlainValidator
+
+
+def _to_float32(value) -> np.ndarray:
+    if value is None:
+        raise ValueError("An embedding is required.")
+
+    # No copy for float32 arrays, so rows of an embedded batch stay views of its matrix
+    vector = np.asarray(value, dtype=np.float32)
+    if vector.ndim != 1:
+        raise ValueError(f"An embedding must be a 1-D vector, got shape {vector.shape}.")
+
+    return vector
+
+
+# A vector kept as a float32 array rather than a list of Python floats; JSON gets a list
+Embedding = Annotated[
+    np.ndarray,
+    PlainValidator(_to_float32),
+    PlainSerializer(lambda value: value.tolist(), when_used="json"),
+]
 
 
 class DataCategory(StrEnum):
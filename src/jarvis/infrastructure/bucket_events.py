@@ -0,0 +1,175 @@
+import queue
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable
+from urllib.parse import unquote_plus
+
+from loguru import logger
+
+
+class BucketChangeSource(ABC):
+    """
+    Abstract source of object keys that were created or changed in a bucket.
+    Sources run in a background thread and `emit` every key they observe.
+    """
+
+    @abstractmethod
+    def run(self, emit: Callable[[str], None], stop: threading.Event) -> None:
+        pass
+
+
+class BucketNotificationSource(BucketChangeSource):
+    """Consumes MinIO bucket event notifications (ObjectCreated events)."""
+
+    def __init__(self, minio_client, bucket_name: str, prefix: str = "") -> None:
+        self._client = minio_client
+        self._bucket_name = bucket_name
+        self._prefix = prefix
+
+    def run(self, emit: Callable[[str], None], stop: threading.Event) -> None:
+        with self._client.listen_bucket_notification(
+            self._bucket_name, prefix=self._prefix, events=["s3:ObjectCreated:*"]
+        ) as events:
+            for event in events:
+                for record in event.get("Records", []):
+                    # Keys arrive URL-encoded in S3 event records
+                    emit(unquote_plus(record["s3"]["object"]["key"]))
+
+                if stop.is_set():
+                    return
+
+
+class IncrementalListingSource(BucketChangeSource):
+    """
+    Polling fallback for stores without event notifications.
+    Each poll only lists keys after the last key seen (`StartAfter`), which catches
+    new uploads in key order. Every `full_scan_every` polls a full listing catches
+    keys that sort before the watermark and overwritten objects (changed ETag).
+    """
+
+    def __init__(
+        self,
+        s3_client,
+        bucket_name: str,
+        poll_interval: float,
+        full_scan_every: int,
+    ) -> None:
+        self._client = s3_client
+        self._bucket_name = bucket_name
+        self._poll_interval = poll_interval
+        self._full_scan_every = full_scan_every
+
+        self._etags: dict[str, str] = {}
+        self._watermark = ""
+
+    def _list(self, start_after: str) -> list[dict]:
+        paginator = self._client.get_paginator("list_objects_v2")
+        pages = paginator.paginate(Bucket=self._bucket_name, StartAfter=start_after)
+
+        return [
+            obj
+            for page in pages
+            for obj in page.get("Contents", [])
+            if not obj["Key"].endswith("/")
+        ]
+
+    def poll(self, full_scan: bool) -> list[str]:
+        """Returns the keys that are new or changed since the previous poll."""
+        objects = self._list("" if full_scan else self._watermark)
+
+        changed = []
+        for obj in objects:
+            key, etag = obj["Key"], obj["ETag"].strip('"')
+            if self._etags.get(key) != etag:
+                self._etags[key] = etag
+                changed.append(key)
+
+            self._watermark = max(self._watermark, key)
+
+        return changed
+
+    def run(self, emit: Callable[[str], None], stop: threading.Event) -> None:
+        num_polls = 0
+        while not stop.is_set():
+            full_scan = num_polls % self._full_scan_every == 0
+            try:
+                for key in self.poll(full_scan=full_scan):
+                    emit(key)
+            except Exception as e:
+                logger.error(f"Error while listing bucket '{self._bucket_name}': {e}")
+
+            num_polls += 1
+            stop.wait(self._poll_interval)
+
+
+def watch_bucket(
+    source: BucketChangeSource,
+    on_batch: Callable[[list[str]], None],
+    debounce: float,
+    stop: threading.Event | None = None,
+    max_retries: int = 3,
+    retry_delay: float = 30.0,
+) -> None:
+    """
+    Runs `source` in a background thread and hands deduplicated batches of keys to `on_batch`.
+    A batch is closed once no new key arrived for `debounce` seconds, so a burst of uploads
+    triggers one ingestion run instead of one per object.
+    If `on_batch` raises, the watcher keeps running: after `retry_delay` seconds the batch's
+    keys are queued again, each up to `max_retries` times before it is given up on.
+    """
+    stop = stop or threading.Event()
+    keys: queue.Queue[str] = queue.Queue()
+    failures: dict[str, int] = {}
+
+    def _run_source() -> None:
+        try:
+            source.run(keys.put, stop)
+        except Exception as e:
+            logger.error(f"Bucket change source stopped: {e}")
+        finally:
+            stop.set()
+
+    thread = threading.Thread(target=_run_source, name="bucket-watch", daemon=True)
+    thread.start()
+
+    try:
+        while not stop.is_set():
+            try:
+                batch = {keys.get(timeout=1.0)}
+            except queue.Empty:
+                continue
+
+            while True:
+                try:
+                    batch.add(keys.get(timeout=debounce))
+                except queue.Empty:
+                    break
+
+            logger.info(f"Detected {len(batch)} new or changed objects.")
+            try:
+                on_batch(sorted(batch))
+            except Exception as e:
+                retry = []
+                for key in sorted(batch):
+                    failures[key] = failures.get(key, 0) + 1
+                    if failures[key] <= max_retries:
+                        retry.append(key)
+                    else:
+                        failures.pop(key)
+                        logger.error(
+                            f"Giving up on {key} after {max_retries} failed retries."
+                        )
+
+                logger.error(
+                    f"Ingestion of {len(batch)} objects failed: {e}. "
+                    f"Retrying {len(retry)} of them in {retry_delay:.0f}s."
+                )
+                if retry:
+                    stop.wait(retry_delay)
+                for key in retry:
+                    keys.put(key)
+            else:
+                for key in batch:
+                    failures.pop(key, None)
+    finally:
+        stop.set()
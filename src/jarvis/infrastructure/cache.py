@@ -0,0 +1,289 @@
+import re
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import unicodedata
+from pathlib import Path
+from contextlib import closing
+
+import numpy as np
+from loguru import logger
+from numpy.typing import NDArray
+
+# Keeps every lookup well below SQLite's bound-parameter limit
+_MAX_KEYS_PER_QUERY = 5000
+
+
+def make_cache_key(*parts) -> str:
+    """Builds a stable key from JSON-serializable parts."""
+    serialized = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class PersistentCache:
+    """
+    Size-bounded LRU cache of zlib-compressed blobs stored in a local SQLite file.
+    Entries older than `ttl_seconds` (if given) are treated as missing.
+    Safe to share between processes; SQLite serializes the writers.
+    """
+
+    def __init__(
+        self, path: str | Path, max_bytes: int, ttl_seconds: float | None = None
+    ) -> None:
+        self._path = Path(path)
+        self._max_bytes = max_bytes
+        self._ttl_seconds = ttl_seconds
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries (last_access)"
+            )
+            # Caches created before TTL support get the column in place
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(entries)")}
+            if "created_at" not in columns:
+                conn.execute("ALTER TABLE entries ADD COLUMN created_at REAL")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._path, timeout=30)
+
+    def get(self, key: str) -> bytes | None:
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT value, created_at FROM entries WHERE key = ?", [key]
+            ).fetchone()
+            if row is None:
+                return None
+
+            now = time.time()
+            if self._ttl_seconds is not None and (row[1] or 0) < now - self._ttl_seconds:
+                conn.execute("DELETE FROM entries WHERE key = ?", [key])
+                return None
+
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", [now, key])
+
+        return zlib.decompress(row[0])
+
+    def set(self, key: str, value: bytes) -> None:
+        self.set_compressed(key, zlib.compress(value))
+
+    def set_compressed(self, key: str, compressed: bytes) -> None:
+        """Stores a value the caller already zlib-compressed, e.g. piece by piece as it was produced."""
+        if len(compressed) > self._max_bytes:
+            logger.warning(f"Not caching {key}, entry exceeds the cache size limit.")
+            return
+
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO entries (key, value, size, last_access, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                [key, compressed, len(compressed), now, now],
+            )
+            self._evict(conn)
+
+    def get_json(self, key: str):
+        value = self.get(key)
+        return json.loads(value) if value is not None else None
+
+    def set_json(self, key: str, value) -> None:
+        self.set(key, json.dumps(value).encode("utf-8"))
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Drops least recently used entries until the cache fits in `max_bytes`."""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self._max_bytes:
+            return
+
+        evicted = []
+        for key, size in conn.execute(
+            "SELECT key, size FROM entries ORDER BY last_access"
+        ).fetchall():
+            if total <= self._max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+
+        conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+        logger.debug(f"Evicted {len(evicted)} entries from {self._path.name}.")
+
+
+def _normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class EmbeddingCache:
+    """
+    Content-addressed store of float32 vectors of one embedding model.
+
+    Vectors live in a fixed-capacity memory-mapped array file (sparse on disk until slots are
+    written), an SQLite index maps the hash of the normalized text to its row. Once the
+    `max_bytes` worth of rows are taken, the least recently used ones are recycled.
+    Every lookup and write runs in one exclusive SQLite transaction, so processes sharing
+    the directory never read a row that is being recycled.
+    """
+
+    def __init__(
+        self, directory: str | Path, model_id: str, dim: int, max_bytes: int
+    ) -> None:
+        self._model_id = model_id
+        self._dim = dim
+        self._capacity = max(max_bytes // (dim * 4), 1)
+
+        safe_model_id = re.sub(r"[^\w.-]", "_", model_id)
+        self._directory = Path(directory) / f"{safe_model_id}-{dim}"
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._index_path = self._directory / "index.sqlite3"
+        vectors_path = self._directory / "vectors.f32"
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    slot INTEGER NOT NULL UNIQUE,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries (last_access)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS free_slots (slot INTEGER PRIMARY KEY)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+            conn.execute("INSERT OR IGNORE INTO meta VALUES ('next_slot', 0)")
+
+            capacity_bytes = self._capacity * dim * 4
+            if not vectors_path.exists() or vectors_path.stat().st_size != capacity_bytes:
+                # A different size cap invalidates the row layout, start over
+                conn.execute("DELETE FROM entries")
+                conn.execute("DELETE FROM free_slots")
+                conn.execute("UPDATE meta SET value = 0 WHERE name = 'next_slot'")
+                with open(vectors_path, "wb") as f:
+                    f.truncate(capacity_bytes)
+
+        self._vectors = np.memmap(
+            vectors_path, dtype=np.float32, mode="r+", shape=(self._capacity, dim)
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._index_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _key(self, text: str) -> str:
+        return make_cache_key(self._model_id, _normalize_text(text))
+
+    def get_many(self, texts: list[str]) -> tuple[NDArray[np.float32], list[int]]:
+        """
+        Returns a (len(texts), dim) matrix with the cached vectors filled in, and the
+        positions of the texts that missed.
+        """
+        vectors = np.zeros((len(texts), self._dim), dtype=np.float32)
+        keys = [self._key(text) for text in texts]
+
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                slots = self._lookup(conn, keys)
+                hits = [i for i, key in enumerate(keys) if key in slots]
+                if hits:
+                    vectors[hits] = self._vectors[[slots[keys[i]] for i in hits]]
+                    now = time.time()
+                    conn.executemany(
+                        "UPDATE entries SET last_access = ? WHERE key = ?",
+                        [(now, key) for key in slots],
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+        misses = [i for i, key in enumerate(keys) if key not in slots]
+
+        return vectors, misses
+
+    def put_many(self, texts: list[str], vectors: NDArray[np.float32]) -> None:
+        # Identical texts in one batch share a row
+        entries = dict(zip((self._key(text) for text in texts), vectors))
+        if len(entries) > self._capacity:
+            entries = dict(list(entries.items())[: self._capacity])
+
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                known = self._lookup(conn, list(entries))
+                entries = {k: v for k, v in entries.items() if k not in known}
+
+                slots = self._allocate(conn, len(entries))
+                if slots:
+                    self._vectors[slots] = np.asarray(
+                        list(entries.values()), dtype=np.float32
+                    )
+                    self._vectors.flush()
+
+                    now = time.time()
+                    conn.executemany(
+                        "INSERT INTO entries (key, slot, last_access) VALUES (?, ?, ?)",
+                        [(key, slot, now) for key, slot in zip(entries, slots)],
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _lookup(self, conn: sqlite3.Connection, keys: list[str]) -> dict[str, int]:
+        slots = {}
+        for i in range(0, len(keys), _MAX_KEYS_PER_QUERY):
+            page = keys[i : i + _MAX_KEYS_PER_QUERY]
+            rows = conn.execute(
+                f"SELECT key, slot FROM entries WHERE key IN ({', '.join('?' * len(page))})",
+                page,
+            )
+            slots.update(rows)
+
+        return slots
+
+    def _allocate(self, conn: sqlite3.Connection, count: int) -> list[int]:
+        """Takes `count` rows: recycled ones first, then fresh ones, then LRU victims."""
+        slots = [
+            row[0]
+            for row in conn.execute("SELECT slot FROM free_slots LIMIT ?", [count])
+        ]
+        conn.executemany("DELETE FROM free_slots WHERE slot = ?", [(s,) for s in slots])
+
+        next_slot = conn.execute(
+            "SELECT value FROM meta WHERE name = 'next_slot'"
+        ).fetchone()[0]
+        fresh = min(count - len(slots), self._capacity - next_slot)
+        slots.extend(range(next_slot, next_slot + fresh))
+        conn.execute(
+            "UPDATE meta SET value = ? WHERE name = 'next_slot'", [next_slot + fresh]
+        )
+
+        if len(slots) < count:
+            victims = conn.execute(
+                "SELECT key, slot FROM entries ORDER BY last_access LIMIT ?",
+                [count - len(slots)],
+            ).fetchall()
+            conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k, _ in victims])
+            slots.extend(slot for _, slot in victims)
+            logger.debug(f"Evicted {len(victims)} vectors from the embedding cache.")
+
+        return slots
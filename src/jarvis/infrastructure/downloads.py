@@ -0,0 +1,206 @@
+import os
+import time
+import asyncio
+import hashlib
+from pathlib import Path
+from dataclasses import dataclass
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ByteBudget:
+    """
+    An asyncio semaphore counted in bytes.
+    Bounds how much object data the fetch stage holds in memory at any moment.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self._capacity = capacity
+        self._available = capacity
+        self._condition = asyncio.Condition()
+
+    @property
+    def available(self) -> int:
+        return self._available
+
+    @asynccontextmanager
+    async def reserve(self, num_bytes: int):
+        # A single request larger than the whole budget waits for all of it
+        num_bytes = min(num_bytes, self._capacity)
+
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._available >= num_bytes)
+            self._available -= num_bytes
+        try:
+            yield num_bytes
+        finally:
+            async with self._condition:
+                self._available += num_bytes
+                self._condition.notify_all()
+
+
+def cached_object_path(cache_dir: str | Path, key: str, etag: str) -> Path:
+    """Returns the local path an object version is spilled to."""
+    key_digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    suffix = Path(key).suffix.lower()
+    return Path(cache_dir) / "objects" / f"{key_digest}-{etag}{suffix}"
+
+
+@dataclass
+class DownloadResult:
+    key: str
+    path: Path
+    num_bytes: int
+    seconds: float
+    sha256: str
+    num_parts: int = 1
+
+    @property
+    def throughput_mb_s(self) -> float:
+        return self.num_bytes / (1024 * 1024) / max(self.seconds, 1e-6)
+
+
+def download_to_file(
+    s3_client,
+    bucket_name: str,
+    key: str,
+    destination: Path,
+    buffer_whole: bool,
+    chunk_size: int,
+) -> DownloadResult:
+    """
+    Downloads a single object into `destination` through one GET request.
+    Small objects are read in one call, large ones are streamed in `chunk_size` pieces
+    so that only one chunk per download is ever held in memory.
+    The content's SHA-256 is computed on the fly from the same chunks.
+    """
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    partial = destination.with_name(destination.name + ".part")
+    started = time.perf_counter()
+
+    body = s3_client.get_object(Bucket=bucket_name, Key=key)["Body"]
+    digest = hashlib.sha256()
+    num_bytes = 0
+    try:
+        with open(partial, "wb") as f:
+            chunks = [body.read()] if buffer_whole else body.iter_chunks(chunk_size)
+            for chunk in chunks:
+                digest.update(chunk)
+                num_bytes += f.write(chunk)
+        os.replace(partial, destination)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    finally:
+        body.close()
+
+    return DownloadResult(
+        key=key,
+        path=destination,
+        num_bytes=num_bytes,
+        seconds=time.perf_counter() - started,
+        sha256=digest.hexdigest(),
+    )
+
+
+def sha256_file(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """Computes the SHA-256 of a local file without reading it into memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def part_ranges(size: int, part_size: int) -> list[tuple[int, int]]:
+    """Splits an object of `size` bytes into inclusive (first, last) byte ranges."""
+    return [
+        (start, min(start + part_size, size) - 1) for start in range(0, size, part_size)
+    ]
+
+
+def download_ranged_to_file(
+    s3_client,
+    bucket_name: str,
+    key: str,
+    etag: str,
+    size: int,
+    destination: Path,
+    part_size: int,
+    part_concurrency: int,
+    chunk_size: int,
+) -> DownloadResult:
+    """
+    Downloads a large object as concurrent byte-range GETs.
+    Each part is written at its own offset of a preallocated file, so parts can land
+    in any order and at most `part_concurrency` chunks are held in memory.
+    Because parts arrive out of order, the SHA-256 is computed in one sequential pass
+    over the assembled file, which is still in the page cache at that point.
+    """
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    partial = destination.with_name(destination.name + ".part")
+    ranges = part_ranges(size, part_size)
+    started = time.perf_counter()
+
+    try:
+        with open(partial, "wb") as f:
+            f.truncate(size)
+
+        num_bytes = _write_ranges(
+            s3_client, bucket_name, key, etag, partial, ranges, part_concurrency, chunk_size
+        )
+        sha256 = sha256_file(partial, chunk_size)
+        os.replace(partial, destination)
+    except BaseException:
+        # A failed download must not leave a preallocated, half-written file behind
+        partial.unlink(missing_ok=True)
+        raise
+
+    return DownloadResult(
+        key=key,
+        path=destination,
+        num_bytes=num_bytes,
+        seconds=time.perf_counter() - started,
+        sha256=sha256,
+        num_parts=len(ranges),
+    )
+
+
+def _write_ranges(
+    s3_client,
+    bucket_name: str,
+    key: str,
+    etag: str,
+    path: Path,
+    ranges: list[tuple[int, int]],
+    part_concurrency: int,
+    chunk_size: int,
+) -> int:
+    """Fetches every byte range concurrently and writes it at its offset of `path`."""
+    fd = os.open(path, os.O_WRONLY)
+
+    def _fetch_part(byte_range: tuple[int, int]) -> int:
+        first, last = byte_range
+        # IfMatch guarantees every part comes from the same object version
+        body = s3_client.get_object(
+            Bucket=bucket_name, Key=key, Range=f"bytes={first}-{last}", IfMatch=etag
+        )["Body"]
+
+        offset = first
+        try:
+            for chunk in body.iter_chunks(chunk_size=chunk_size):
+                offset += os.pwrite(fd, chunk, offset)
+        finally:
+            body.close()
+
+        if offset != last + 1:
+            raise IOError(f"Short read for {key} range {first}-{last}")
+
+        return offset - first
+
+    try:
+        with ThreadPoolExecutor(max_workers=part_concurrency) as pool:
+            return sum(pool.map(_fetch_part, ranges))
+    finally:
+        os.close(fd)
@@ -0,0 +1,241 @@
+import sqlite3
+from pathlib import Path
+from contextlib import closing
+from datetime import datetime, timezone
+from typing import Iterable
+
+from loguru import logger
+
+from jarvis.settings import settings
+
+# Keeps every lookup well below SQLite's bound-parameter limit
+_MAX_PAIRS_PER_QUERY = 5000
+
+
+class IngestionLedger:
+    """
+    Local record of which object versions have already been ingested.
+    Rows are keyed by (object key, ETag, pipeline version), so bumping PIPELINE_VERSION
+    makes every object eligible for re-ingestion without touching the vector DB.
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        pipeline_version: str = settings.PIPELINE_VERSION,
+    ) -> None:
+        self._path = (
+            Path(path)
+            if path
+            else Path(settings.INGESTION_CACHE_DIR) / "ingestion_ledger.sqlite3"
+        )
+        self._pipeline_version = pipeline_version
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS processed_objects (
+                    object_key TEXT NOT NULL,
+                    etag TEXT NOT NULL,
+                    pipeline_version TEXT NOT NULL,
+                    processed_at TEXT NOT NULL,
+                    PRIMARY KEY (object_key, etag, pipeline_version)
+                )
+                """
+            )
+            # Ledgers created before content hashing get the new columns in place
+            columns = {
+                row[1] for row in conn.execute("PRAGMA table_info(processed_objects)")
+            }
+            for column in ("content_sha256", "alias_of"):
+                if column not in columns:
+                    conn.execute(
+                        f"ALTER TABLE processed_objects ADD COLUMN {column} TEXT"
+                    )
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_processed_objects_sha
+                ON processed_objects (content_sha256, pipeline_version)
+                """
+            )
+
+    @property
+    def pipeline_version(self) -> str:
+        return self._pipeline_version
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._path, timeout=30)
+
+    def is_empty(self) -> bool:
+        """
+        True when nothing has been recorded under any pipeline version, i.e. the ledger
+        was just created. A ledger that only holds older versions is not empty: a version
+        bump is meant to re-ingest everything.
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT 1 FROM processed_objects LIMIT 1").fetchone()
+
+        return row is None
+
+    def processed_pairs(self, pairs: list[tuple[str, str]]) -> set[tuple[str, str]]:
+        """Returns the subset of (object key, ETag) pairs already ingested by this pipeline version."""
+        found = set()
+        with closing(self._connect()) as conn:
+            for i in range(0, len(pairs), _MAX_PAIRS_PER_QUERY):
+                page = pairs[i : i + _MAX_PAIRS_PER_QUERY]
+                values = ", ".join("(?, ?)" for _ in page)
+                params = [value for pair in page for value in pair]
+
+                rows = conn.execute(
+                    f"""
+                    SELECT object_key, etag FROM processed_objects
+                    WHERE pipeline_version = ? AND (object_key, etag) IN (VALUES {values})
+                    """,
+                    [self._pipeline_version, *params],
+                ).fetchall()
+                found.update(rows)
+
+        return found
+
+    def filter_unprocessed(self, objects: list[dict]) -> list[dict]:
+        """
+        Filters a page of `list_objects_v2` entries down to the ones not yet ingested.
+        The whole page is resolved with a single local query.
+        """
+        if not objects:
+            return []
+
+        pairs = [(obj["Key"], obj["ETag"].strip('"')) for obj in objects]
+        processed = self.processed_pairs(pairs)
+
+        return [obj for obj, pair in zip(objects, pairs) if pair not in processed]
+
+    def mark_processed(self, entries: Iterable[tuple]) -> int:
+        """
+        Records objects as ingested. Each entry is (object key, ETag, content hash, alias of),
+        where `alias of` names the object whose chunks a byte-identical duplicate reuses.
+        Returns the number of rows written.
+        """
+        processed_at = datetime.now(timezone.utc).isoformat()
+        rows = [
+            (key, etag, self._pipeline_version, processed_at, sha256, alias_of)
+            for key, etag, sha256, alias_of in entries
+        ]
+        if not rows:
+            return 0
+
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO processed_objects
+                (object_key, etag, pipeline_version, processed_at, content_sha256, alias_of)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+
+        return len(rows)
+
+    def find_by_content_hash(self, hashes: list[str]) -> dict[str, str]:
+        """Maps content hashes that were already ingested to the key of their canonical object."""
+        found = {}
+        with closing(self._connect()) as conn:
+            for i in range(0, len(hashes), _MAX_PAIRS_PER_QUERY):
+                page = hashes[i : i + _MAX_PAIRS_PER_QUERY]
+                placeholders = ", ".join("?" for _ in page)
+
+                rows = conn.execute(
+                    f"""
+                    SELECT content_sha256, MIN(object_key) FROM processed_objects
+                    WHERE pipeline_version = ? AND alias_of IS NULL
+                    AND content_sha256 IN ({placeholders})
+                    GROUP BY content_sha256
+                    """,
+                    [self._pipeline_version, *page],
+                ).fetchall()
+                found.update(rows)
+
+        return found
+
+    def aliases_of(self, content_sha256: str) -> list[dict]:
+        """Returns every object recorded as a duplicate of the given content."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                """
+                SELECT object_key, etag FROM processed_objects
+                WHERE pipeline_version = ? AND content_sha256 = ? AND alias_of IS NOT NULL
+                ORDER BY object_key
+                """,
+                [self._pipeline_version, content_sha256],
+            ).fetchall()
+
+        return [{"source_file": key, "etag": etag} for key, etag in rows]
+
+    def reconcile(self, qdrant_client, collection_names: Iterable[str]) -> int:
+        """
+        Rebuilds this pipeline version's rows from the payloads actually stored in Qdrant.
+        Objects whose chunks were deleted from the vector DB become eligible for ingestion again.
+        """
+        entries = set()
+        for collection_name in collection_names:
+            if not qdrant_client.collection_exists(collection_name):
+                continue
+
+            offset = None
+            while True:
+                records, offset = qdrant_client.scroll(
+                    collection_name=collection_name,
+                    limit=1024,
+                    offset=offset,
+                    with_payload=[
+                        "metadata.source_file",
+                        "metadata.etag",
+                        "metadata.content_sha256",
+                        "metadata.aliases",
+                    ],
+                    with_vectors=False,
+                )
+                for record in records:
+                    metadata = (record.payload or {}).get("metadata", {})
+                    entries.update(self._entries_from_metadata(metadata))
+
+                if offset is None:
+                    break
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "DELETE FROM processed_objects WHERE pipeline_version = ?",
+                [self._pipeline_version],
+            )
+        self.mark_processed(entries)
+
+        logger.info(
+            f"Reconciled ingestion ledger against Qdrant: {len(entries)} processed objects."
+        )
+
+        return len(entries)
+
+    @staticmethod
+    def _entries_from_metadata(metadata: dict) -> set[tuple]:
+        entries = set()
+        key, etag = metadata.get("source_file"), metadata.get("etag")
+        if not key or not etag:
+            return entries
+
+        sha256 = metadata.get("content_sha256")
+        entries.add((key, etag, sha256, None))
+        for alias in metadata.get("aliases") or []:
+            entries.add((alias["source_file"], alias["etag"], sha256, key))
+
+        return entries
+
+    @classmethod
+    def entries_from_documents(cls, documents: list) -> set[tuple]:
+        """Collects the ledger entries referenced by stored documents' metadata."""
+        entries = set()
+        for document in documents:
+            metadata = getattr(document, "metadata", None) or {}
+            entries.update(cls._entries_from_metadata(metadata))
+
+        return entries
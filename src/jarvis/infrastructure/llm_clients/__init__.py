@@ -0,0 +1,408 @@
+import os
+import asyncio
+import hashlib
+from pathlib import Path
+
+from loguru import logger
+from dotenv import load_dotenv
+from pydantic import TypeAdapter
+
+from jarvis.domain.books import (
+    Chapter,
+    BookMetadata,
+    ChapterContent,
+    ChapterEnrichment,
+    SectionEnrichment,
+)
+from jarvis.infrastructure.cache import PersistentCache, make_cache_key
+from jarvis.infrastructure.rate_limiting import AdaptiveRateLimiter
+from jarvis.settings import settings
+
+from .resilience import CallPolicy, CircuitOpenError, ResilientCaller
+from .scheduling import CallPriority, PriorityScheduler, document_rank
+from .backends import (
+    CHARS_PER_TOKEN,
+    GeminiBackend,
+    LLMBackend,
+    LLMResponse,
+    SimulatedBackend,
+    estimate_tokens,
+)
+
+load_dotenv()
+
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+
+# cache storage
+_backend: LLMBackend | None = None
+_response_cache: PersistentCache | None = None
+_rate_limiter: AdaptiveRateLimiter | None = None
+_resilient_callers: dict[str, ResilientCaller] = {}
+_scheduler: PriorityScheduler | None = None
+
+# Per-function priorities, deadlines, hedging and breaker settings; unlisted functions use
+# the defaults. Hedging pays for duplicate requests, so it is reserved for short calls on the
+# critical path.
+CALL_POLICIES: dict[str, CallPolicy] = {
+    "get_toc_from_llm": CallPolicy(
+        priority=CallPriority.CRITICAL, timeout_seconds=60, hedge=True
+    ),
+    "get_metadata_from_llm": CallPolicy(
+        priority=CallPriority.CRITICAL, timeout_seconds=30, hedge=True
+    ),
+    "merge_chapter_summaries_from_llm": CallPolicy(
+        priority=CallPriority.REDUCE, timeout_seconds=60, hedge=True
+    ),
+    "get_packed_chapter_enrichments_from_llm": CallPolicy(timeout_seconds=180),
+}
+
+
+def get_llm_backend() -> LLMBackend:
+    """Backend selected by LLM_BACKEND: "gemini" or "simulated" (offline load testing)."""
+    global _backend
+    if _backend is None:
+        if settings.LLM_BACKEND == "gemini":
+            _backend = GeminiBackend(GOOGLE_API_KEY, settings.GEMINI_MODEL_ID)
+        elif settings.LLM_BACKEND == "simulated":
+            _backend = SimulatedBackend(
+                latency_median_seconds=settings.LLM_SIM_LATENCY_MEDIAN_SECONDS,
+                latency_sigma=settings.LLM_SIM_LATENCY_SIGMA,
+                rate_limit_rate=settings.LLM_SIM_RATE_LIMIT_RATE,
+                timeout_rate=settings.LLM_SIM_TIMEOUT_RATE,
+                timeout_seconds=settings.LLM_SIM_TIMEOUT_SECONDS,
+                seed=settings.LLM_SIM_SEED,
+            )
+        else:
+            raise ValueError(f"Unknown LLM backend: {settings.LLM_BACKEND}")
+
+    return _backend
+
+
+def set_llm_backend(backend: LLMBackend | None) -> None:
+    """Swaps the backend for every subsequent call, e.g. to a SimulatedBackend in benchmarks."""
+    global _backend
+    _backend = backend
+
+
+def get_resilient_caller(function_name: str) -> ResilientCaller:
+    if function_name not in _resilient_callers:
+        _resilient_callers[function_name] = ResilientCaller(
+            function_name, CALL_POLICIES.get(function_name, CallPolicy())
+        )
+
+    return _resilient_callers[function_name]
+
+
+def llm_call_metrics() -> dict:
+    """Call counts, latency quantiles, hedges and breaker state per LLM function."""
+    return {name: caller.metrics() for name, caller in _resilient_callers.items()}
+
+
+def get_llm_scheduler() -> PriorityScheduler:
+    """Process-wide gate that decides which waiting LLM call is sent next."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = PriorityScheduler(settings.LLM_MAX_CONCURRENCY)
+
+    return _scheduler
+
+
+def get_rate_limiter() -> AdaptiveRateLimiter:
+    """Process-wide limiter; its budget is shared with other processes through the cache dir."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = AdaptiveRateLimiter(
+            requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+            tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+            state_path=Path(settings.INGESTION_CACHE_DIR) / "llm_rate_limit.json",
+        )
+
+    return _rate_limiter
+
+
+def _get_response_cache() -> PersistentCache | None:
+    global _response_cache
+    if _response_cache is None and settings.LLM_CACHE_ENABLED:
+        _response_cache = PersistentCache(
+            Path(settings.INGESTION_CACHE_DIR) / "llm_cache.sqlite3",
+            max_bytes=settings.LLM_CACHE_MAX_BYTES,
+            ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+        )
+
+    return _response_cache
+
+
+async def _call_backend(
+    function_name: str, prompt: str, response_schema=None
+) -> LLMResponse:
+    """
+    Sends a prompt once the scheduler grants it a slot and the shared RPM/TPM budget allows
+    it, under the function's CallPolicy. The slot is held while waiting for the limiter, so
+    the budget is spent on the most urgent calls first, and given up during backoffs.
+    429 responses shrink the shared rate and are retried right away (the limiter paces them);
+    other errors and missed deadlines are retried after a jittered backoff.
+    An open circuit raises CircuitOpenError, which even the getters that otherwise fall
+    back to empty results pass on, so a short-circuited chapter is never stored unenriched.
+    """
+    limiter = get_rate_limiter()
+    caller = get_resilient_caller(function_name)
+    estimated_tokens = estimate_tokens(prompt) + settings.LLM_EXPECTED_OUTPUT_TOKENS
+
+    async def _send() -> LLMResponse:
+        return await get_llm_backend().generate(prompt, response_schema)
+
+    async def _send_hedge() -> LLMResponse:
+        await limiter.acquire(estimated_tokens)
+        return await _send()
+
+    for attempt in range(caller.policy.max_retries + 1):
+        try:
+            async with get_llm_scheduler().slot(caller.policy.priority):
+                await limiter.acquire(estimated_tokens)
+                response = await caller.attempt(_send, _send_hedge)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            throttled = getattr(e, "code", None) == 429
+            if throttled:
+                await asyncio.to_thread(limiter.record_throttled)
+            if attempt == caller.policy.max_retries:
+                raise
+
+            if not throttled:
+                logger.warning(
+                    f"{function_name} attempt {attempt + 1} failed "
+                    f"({type(e).__name__}: {e}), retrying."
+                )
+                await asyncio.sleep(caller.policy.backoff(attempt))
+            continue
+
+        await asyncio.to_thread(
+            limiter.record_success, estimated_tokens, response.total_tokens
+        )
+
+        return response
+
+
+async def _generate(function_name: str, prompt: str, response_schema=None):
+    """
+    Runs one LLM call and returns the parsed response (or the text without a schema).
+    Non-empty responses are cached on disk, keyed by calling function, model id, prompt hash
+    and response schema, so re-running unchanged inputs costs no API call.
+    """
+    adapter = TypeAdapter(response_schema if response_schema is not None else str)
+    cache = _get_response_cache()
+    key = make_cache_key(
+        function_name,
+        get_llm_backend().model_id,
+        hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+        adapter.json_schema() if response_schema is not None else None,
+    )
+
+    if cache is not None:
+        cached = await asyncio.to_thread(cache.get_json, key)
+        if cached is not None:
+            logger.debug(f"LLM cache hit for {function_name}.")
+            return adapter.validate_python(cached)
+
+    response = await _call_backend(function_name, prompt, response_schema)
+    result = response.parsed if response_schema is not None else response.text
+
+    if cache is not None and result:
+        await asyncio.to_thread(
+            cache.set_json, key, adapter.dump_python(result, mode="json")
+        )
+
+    return result
+
+
+async def get_toc_from_llm(toc_text: str) -> list[Chapter]:
+    prompt = f"""
+    You are a document analysis tool. 
+        
+    Parse the following Table of Contents Markdown text and return a JSON array of objects. 
+    Each object must have a 'chapter_title' (string), and a 'chapter_number' (integer or string)
+        
+    Below is the TOC (remember to output all the chapters):
+    {toc_text}
+    """
+    parsed = await _generate("get_toc_from_llm", prompt, list[Chapter])
+
+    try:
+        return parsed or []
+    except Exception as e:
+        logger.error(f"Error parsing LLM response for TOC: {e}")
+        return []
+
+
+async def get_metadata_from_llm(md_snippet: str) -> BookMetadata | None:
+    prompt = f"""
+    You are part of a RAG System. Your task is to extract the title, authors and publication year from the provided Markdown snippet of a book.
+    You are to respond with a JSON object only, it should contain a `title` (str) key, `authors` (list of str) key and a `publication_year` (int) key
+    
+    There should be no special signs (newlines, etc.) in any of the keys. For example:
+    If you find text like The Aviator\\n's Handbook, the title should be The Aviator's Handbook, without the special sign.
+    
+    Below is the snippet:
+    {md_snippet}
+    """
+    parsed = await _generate("get_metadata_from_llm", prompt, BookMetadata)
+
+    try:
+        return parsed if parsed else None
+    except Exception as e:
+        logger.error(f"Error parsing LLM response for metadata: {e}")
+        return None
+
+
+async def get_chapter_summaries_from_llm(chapter: ChapterContent) -> list:
+    prompt = f"""
+    You are an AI subject-matter expert. Your task is to distill the core knowledge from the provided book chapter. Your output will be used to create vector embeddings for a Retrieval-Augmented Generation (RAG) system that must answer direct questions from engineers.
+    Do not write sentences that describe what the chapter contains (e.g., "This chapter introduces..."). Instead, extract the key concepts and present them as direct, factual statements.
+    For each key concept, provide a single, declarative sentence that defines or explains it.
+    Your output MUST be a valid JSON list of strings.
+    ---
+    Bad Example (describes the content):
+    [
+        "This section explains different caching strategies."
+    ]
+
+    Good Example (states the knowledge directly):
+    [
+        "A Least Recently Used (LRU) cache evicts the items that have not been accessed for the longest time to make space for new entries."
+    ]
+    ---
+    Below is the chapter:
+    {chapter.content}
+    """
+    try:
+        return await _generate("get_chapter_summaries_from_llm", prompt, list[str]) or []
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        logger.error(f"Error during summarizing chapter with LLM {e}")
+        return []
+
+
+async def get_full_chapter_summary_from_llm(chapter: ChapterContent) -> str | None:
+    prompt = f"""
+    You are a text analyst. 
+    Write a single, concise paragraph that summarizes the main topics and purpose of the following book chapter. 
+    This summary will be used to provide broader context in a RAG system.
+
+    Chapter {chapter.chapter_number}, {chapter.title}:
+    {chapter.content}
+    """
+    try:
+        return await _generate("get_full_chapter_summary_from_llm", prompt) or None
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        logger.error(f"Error during full chapter summarization with LLM {e}")
+        return None
+
+
+async def get_chapter_enrichment_from_llm(
+    chapter: ChapterContent,
+) -> ChapterEnrichment | None:
+    """Key-concept nuggets and the summary paragraph for a chapter from a single call."""
+    prompt = f"""
+    You are an AI subject-matter expert. Your output will be used to create vector embeddings for a Retrieval-Augmented Generation (RAG) system that must answer direct questions from engineers.
+    Respond with a JSON object with two keys:
+
+    `key_concepts`: a list of strings distilling the core knowledge of the chapter.
+    Do not write sentences that describe what the chapter contains (e.g., "This chapter introduces..."). Instead, extract the key concepts and present them as direct, factual statements.
+    For each key concept, provide a single, declarative sentence that defines or explains it.
+    ---
+    Bad Example (describes the content):
+    "This section explains different caching strategies."
+
+    Good Example (states the knowledge directly):
+    "A Least Recently Used (LRU) cache evicts the items that have not been accessed for the longest time to make space for new entries."
+    ---
+
+    `summary`: a single, concise paragraph that summarizes the main topics and purpose of the chapter, used to provide broader context.
+
+    Chapter {chapter.chapter_number}, {chapter.title}:
+    {chapter.content}
+    """
+    try:
+        return await _generate("get_chapter_enrichment_from_llm", prompt, ChapterEnrichment)
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        logger.error(f"Error during chapter enrichment with LLM {e}")
+        return None
+
+
+async def merge_chapter_summaries_from_llm(
+    chapter: ChapterContent, partial_summaries: list[str]
+) -> str | None:
+    """Reduces the summaries of consecutive parts of a long chapter into one paragraph."""
+    parts = "\n\n".join(
+        f"Part {i}: {summary}" for i, summary in enumerate(partial_summaries, start=1)
+    )
+    prompt = f"""
+    You are a text analyst.
+    Below are summaries of consecutive parts of one book chapter, in reading order.
+    Write a single, concise paragraph that summarizes the main topics and purpose of the whole chapter.
+    This summary will be used to provide broader context in a RAG system.
+
+    Chapter {chapter.chapter_number}, {chapter.title}:
+    {parts}
+    """
+    try:
+        return await _generate("merge_chapter_summaries_from_llm", prompt) or None
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        logger.error(f"Error during merging chapter summaries with LLM {e}")
+        return None
+
+
+async def get_packed_chapter_enrichments_from_llm(
+    chapters: list[ChapterContent],
+) -> dict[str, ChapterEnrichment]:
+    """
+    Enriches several short chapters with one request.
+    Returns {chapter id: enrichment} for every section the response covered.
+    """
+    section_ids = {f"S{i}": chapter for i, chapter in enumerate(chapters, start=1)}
+    sections = "\n\n".join(
+        f"=== SECTION {section_id}: Chapter {chapter.chapter_number}, {chapter.title} ===\n"
+        f"{chapter.content}"
+        for section_id, chapter in section_ids.items()
+    )
+    prompt = f"""
+    You are an AI subject-matter expert. Your output will be used to create vector embeddings for a Retrieval-Augmented Generation (RAG) system that must answer direct questions from engineers.
+    Below are several independent sections of a book, each introduced by a line with its section id.
+    Respond with a JSON array holding one object per section, with three keys:
+
+    `section_id`: the id of the section, exactly as given (e.g. "S1").
+
+    `key_concepts`: a list of strings distilling the core knowledge of that section only.
+    Do not write sentences that describe what the section contains (e.g., "This section introduces..."). Instead, extract the key concepts and present them as direct, factual statements.
+    For each key concept, provide a single, declarative sentence that defines or explains it.
+
+    `summary`: a single, concise paragraph that summarizes the main topics and purpose of that section, used to provide broader context.
+
+    Below are the sections:
+    {sections}
+    """
+    try:
+        parsed = await _generate(
+            "get_packed_chapter_enrichments_from_llm", prompt, list[SectionEnrichment]
+        )
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        logger.error(f"Error during packed chapter enrichment with LLM {e}")
+        return {}
+
+    return {
+        str(section_ids[item.section_id].id): ChapterEnrichment(
+            key_concepts=item.key_concepts, summary=item.summary
+        )
+        for item in parsed or []
+        if item.section_id in section_ids
+    }
@@ -0,0 +1,214 @@
+import re
+import types
+import random
+import asyncio
+import hashlib
+import typing
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from dataclasses import dataclass
+
+from google import genai
+from loguru import logger
+from pydantic import BaseModel
+
+from jarvis.domain.books import Chapter, SectionEnrichment
+
+# Rough characters-per-token ratio used to budget a prompt before sending it
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+@dataclass
+class LLMResponse:
+    text: str | None
+    parsed: typing.Any = None  # Instance of the response schema, if one was requested
+    total_tokens: int | None = None
+
+
+class LLMBackendError(Exception):
+    """API error carrying an HTTP-like status `code`, the way google-genai errors do."""
+
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class LLMBackend(ABC):
+    """Abstract model endpoint that llm_clients sends its prompts to."""
+
+    @property
+    @abstractmethod
+    def model_id(self) -> str:
+        """Identifies the model in cache keys, so responses of different backends never mix."""
+
+    @abstractmethod
+    async def generate(self, prompt: str, response_schema=None) -> LLMResponse:
+        pass
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini through google-genai, with one client per event loop."""
+
+    def __init__(self, api_key: str | None, model_id: str) -> None:
+        self._api_key = api_key
+        self._model_id = model_id
+        self._clients = {}
+
+    @property
+    def model_id(self) -> str:
+        return self._model_id
+
+    def _get_client(self) -> genai.Client:
+        loop = asyncio.get_running_loop()
+        if loop not in self._clients:
+            if not self._api_key:
+                raise ValueError("Gemini API key is not set.")
+
+            logger.debug(f"{id(loop)}: Initializing new Gemini API client.")
+            self._clients[loop] = genai.Client(api_key=self._api_key)
+
+        return self._clients[loop]
+
+    async def generate(self, prompt: str, response_schema=None) -> LLMResponse:
+        config = (
+            {"response_mime_type": "application/json", "response_schema": response_schema}
+            if response_schema is not None
+            else None
+        )
+        response = await self._get_client().aio.models.generate_content(
+            model=self._model_id, contents=prompt, config=config
+        )
+        usage = getattr(response, "usage_metadata", None)
+
+        return LLMResponse(
+            text=response.text,
+            parsed=response.parsed if response_schema is not None else None,
+            total_tokens=getattr(usage, "total_token_count", None),
+        )
+
+
+class SimulatedBackend(LLMBackend):
+    """
+    Offline stand-in for load tests: answers every prompt with a schema-valid response
+    after a log-normally distributed delay, and injects 429s and timeouts at given rates.
+
+    Everything is derived from a seed, the prompt and how often that prompt was sent before,
+    so runs are reproducible regardless of how concurrent calls interleave, while a retried
+    prompt can still succeed. TOC prompts get their entry lines back as chapters and packed
+    section prompts get one result per section id, so downstream stages see realistic shapes.
+    """
+
+    def __init__(
+        self,
+        latency_median_seconds: float = 1.0,
+        latency_sigma: float = 0.5,
+        rate_limit_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        timeout_seconds: float = 60.0,
+        seed: int = 0,
+    ) -> None:
+        self._latency_median_seconds = latency_median_seconds
+        self._latency_sigma = latency_sigma
+        self._rate_limit_rate = rate_limit_rate
+        self._timeout_rate = timeout_rate
+        self._timeout_seconds = timeout_seconds
+        self._seed = seed
+        self._attempts: dict[str, int] = defaultdict(int)
+
+    @property
+    def model_id(self) -> str:
+        return f"simulated-{self._seed}"
+
+    def _rng(self, prompt: str) -> random.Random:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        attempt = self._attempts[digest]
+        self._attempts[digest] += 1
+
+        return random.Random(f"{self._seed}:{digest}:{attempt}")
+
+    async def generate(self, prompt: str, response_schema=None) -> LLMResponse:
+        rng = self._rng(prompt)
+
+        outcome = rng.random()
+        if outcome < self._timeout_rate:
+            await asyncio.sleep(self._timeout_seconds)
+            raise LLMBackendError(504, "Simulated deadline exceeded.")
+
+        latency = rng.lognormvariate(0, self._latency_sigma)
+        await asyncio.sleep(latency * self._latency_median_seconds)
+
+        if outcome < self._timeout_rate + self._rate_limit_rate:
+            raise LLMBackendError(429, "Simulated resource exhausted.")
+
+        if response_schema is None:
+            text = _fake_sentence(rng, prompt, words=60)
+            return LLMResponse(text=text, total_tokens=estimate_tokens(prompt + text))
+
+        parsed = _fake_value(response_schema, rng, prompt)
+        return LLMResponse(
+            text=None,
+            parsed=parsed,
+            total_tokens=estimate_tokens(prompt) + estimate_tokens(repr(parsed)),
+        )
+
+
+_TOC_ENTRY = re.compile(r"^\s*(?:[-*+]|\d+[.)]|#{1,6})\s+(.+?)\s*(?:\.{2,}\s*\d+)?\s*$")
+_SECTION_ID = re.compile(r"=== SECTION (\S+?):")
+
+
+def _fake_sentence(rng: random.Random, prompt: str, words: int) -> str:
+    vocabulary = re.findall(r"[A-Za-z]{4,}", prompt[-4000:]) or ["lorem", "ipsum"]
+    return " ".join(rng.choice(vocabulary) for _ in range(words)).capitalize() + "."
+
+
+def _fake_toc(prompt: str) -> list[Chapter]:
+    toc_text = prompt.split("Below is the TOC", 1)[-1]
+    titles = [
+        match.group(1).strip("*_ ")
+        for line in toc_text.splitlines()
+        if (match := _TOC_ENTRY.match(line))
+        and match.group(1).strip("*_ ").casefold()
+        not in ("contents", "table of contents", "toc")
+    ]
+    return [
+        Chapter(chapter_title=title, chapter_number=i)
+        for i, title in enumerate(titles, start=1)
+    ]
+
+
+def _fake_value(schema, rng: random.Random, prompt: str):
+    """Builds a deterministic instance of `schema` (a pydantic model or a typing type)."""
+    if schema == list[Chapter]:
+        return _fake_toc(prompt)
+    if schema == list[SectionEnrichment]:
+        return [
+            SectionEnrichment(
+                section_id=section_id,
+                key_concepts=_fake_value(list[str], rng, prompt),
+                summary=_fake_sentence(rng, prompt, words=40),
+            )
+            for section_id in _SECTION_ID.findall(prompt)
+        ]
+
+    origin, args = typing.get_origin(schema), typing.get_args(schema)
+    if origin is list:
+        return [_fake_value(args[0], rng, prompt) for _ in range(rng.randint(3, 8))]
+    if origin in (typing.Union, types.UnionType):
+        return _fake_value(next(a for a in args if a is not type(None)), rng, prompt)
+    if isinstance(schema, type) and issubclass(schema, BaseModel):
+        return schema(
+            **{
+                name: _fake_value(field.annotation, rng, prompt)
+                for name, field in schema.model_fields.items()
+            }
+        )
+    if schema is int:
+        return rng.randint(1950, 2025)
+    if schema is str:
+        return _fake_sentence(rng, prompt, words=rng.randint(6, 20))
+
+    return None
@@ -0,0 +1,215 @@
+import time
+import random
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from loguru import logger
+
+from jarvis.settings import settings
+
+from .scheduling import CallPriority
+
+
+@dataclass(frozen=True)
+class CallPolicy:
+    """How one LLM function is called: priority, deadline, retries, hedging and circuit breaking."""
+
+    priority: int = CallPriority.BULK
+
+    timeout_seconds: float = settings.LLM_CALL_TIMEOUT_SECONDS
+    max_retries: int = settings.LLM_MAX_RETRIES
+    backoff_base_seconds: float = 1.0
+    backoff_max_seconds: float = 30.0
+    # Send a duplicate attempt once the first one runs longer than this latency quantile
+    hedge: bool = False
+    hedge_quantile: float = 0.95
+    hedge_min_samples: int = 20
+    breaker_failure_threshold: int = settings.LLM_BREAKER_FAILURE_THRESHOLD
+    breaker_reset_seconds: float = settings.LLM_BREAKER_RESET_SECONDS
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number `attempt` (0-based)."""
+        ceiling = min(self.backoff_max_seconds, self.backoff_base_seconds * 2**attempt)
+        return random.uniform(0, ceiling)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_seconds`. After that a single trial call is let through (half-open): its success
+    closes the breaker, its failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float) -> None:
+        self._name = name
+        self._failure_threshold = failure_threshold
+        self._reset_seconds = reset_seconds
+        self._consecutive_failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self._reset_seconds:
+            return "open"
+        return "half_open"
+
+    def before_call(self) -> None:
+        state = self.state
+        if state == "open" or (state == "half_open" and self._trial_in_flight):
+            raise CircuitOpenError(f"Circuit for {self._name} is open, not calling it.")
+        if state == "half_open":
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        if self._opened_at is not None:
+            logger.info(f"Circuit for {self._name} closed again.")
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """Lets another trial through after one ended without telling anything about the endpoint."""
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._consecutive_failures += 1
+        self._trial_in_flight = False
+        if self._opened_at is not None or (
+            self._consecutive_failures >= self._failure_threshold
+        ):
+            if self.state != "open":
+                logger.warning(
+                    f"Circuit for {self._name} opened after "
+                    f"{self._consecutive_failures} consecutive failures."
+                )
+            self._opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies."""
+
+    def __init__(self, window: int = 200) -> None:
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float) -> float | None:
+        if not self._samples:
+            return None
+
+        ordered = sorted(self._samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+async def _first_success(tasks: set[asyncio.Task]):
+    """Result of the first task to succeed; raises the last error if all of them fail."""
+    error = None
+    while tasks:
+        done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is None:
+                return task.result()
+            error = task.exception()
+
+    raise error
+
+
+class ResilientCaller:
+    """
+    Runs calls of one LLM function under its CallPolicy.
+    Every attempt has a deadline; with hedging on, an attempt still running after the
+    observed p95 latency gets a duplicate and whichever finishes first wins, so a single
+    straggler no longer sets the batch's tail latency.
+    """
+
+    def __init__(self, name: str, policy: CallPolicy) -> None:
+        self.name = name
+        self.policy = policy
+        self.breaker = CircuitBreaker(
+            name, policy.breaker_failure_threshold, policy.breaker_reset_seconds
+        )
+        self.latencies = LatencyTracker()
+        self.num_calls = 0
+        self.num_failures = 0
+        self.num_hedges = 0
+
+    def _hedge_delay(self) -> float | None:
+        if not self.policy.hedge or len(self.latencies) < self.policy.hedge_min_samples:
+            return None
+
+        return self.latencies.quantile(self.policy.hedge_quantile)
+
+    async def _attempt(
+        self, call: Callable[[], Awaitable], hedge_call: Callable[[], Awaitable]
+    ):
+        tasks = {asyncio.create_task(call())}
+        try:
+            hedge_delay = self._hedge_delay()
+            if hedge_delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+                if not done:
+                    self.num_hedges += 1
+                    tasks.add(asyncio.create_task(hedge_call()))
+
+            return await _first_success(tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def attempt(
+        self,
+        call: Callable[[], Awaitable],
+        hedge_call: Callable[[], Awaitable] | None = None,
+    ):
+        """
+        One deadline-bound (possibly hedged) attempt, tracked by the breaker.
+        `hedge_call` makes the duplicate request, e.g. after taking its own rate-limit budget.
+        Rate-limit rejections (429) are not held against the endpoint.
+        """
+        self.breaker.before_call()
+        self.num_calls += 1
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(
+                self._attempt(call, hedge_call or call),
+                timeout=self.policy.timeout_seconds,
+            )
+        except asyncio.CancelledError:
+            self.breaker.release_trial()
+            raise
+        except Exception as e:
+            self.num_failures += 1
+            if getattr(e, "code", None) == 429:
+                self.breaker.release_trial()
+            else:
+                self.breaker.record_failure()
+            raise
+
+        self.latencies.add(time.monotonic() - started)
+        self.breaker.record_success()
+
+        return result
+
+    def metrics(self) -> dict:
+        p50, p95 = self.latencies.quantile(0.5), self.latencies.quantile(0.95)
+        return {
+            "num_calls": self.num_calls,
+            "num_failures": self.num_failures,
+            "num_hedges": self.num_hedges,
+            "p50_seconds": round(p50, 3) if p50 is not None else None,
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+            "breaker": self.breaker.state,
+        }
@@ -0,0 +1,82 @@
+import heapq
+import asyncio
+import itertools
+from enum import IntEnum
+from contextvars import ContextVar
+from contextlib import asynccontextmanager
+
+
+class CallPriority(IntEnum):
+    CRITICAL = 0  # Gates all further work on a document: TOC, metadata
+    REDUCE = 1  # Finishes a chapter whose other calls are already done
+    BULK = 2  # Independent per-chapter enrichment
+
+
+# Position of the document the current task works on; among calls of equal priority the
+# earlier document goes first, so documents complete one after another instead of all at the end
+document_rank: ContextVar[int] = ContextVar("document_rank", default=0)
+
+
+class PriorityScheduler:
+    """
+    Admits at most `max_concurrency` LLM calls at a time. Calls that have to wait are started
+    in (priority, document rank, arrival) order, so critical-path calls of every document
+    overtake queued bulk summaries and a document's remaining calls run before later ones.
+    """
+
+    def __init__(self, max_concurrency: int) -> None:
+        self._max_concurrency = max_concurrency
+        self._in_flight = 0
+        self._waiters: list[tuple[int, int, int, asyncio.Future]] = []
+        self._arrivals = itertools.count()
+        self._num_admitted = 0
+        self._num_queued = 0
+        self._max_queue_length = 0
+
+    @asynccontextmanager
+    async def slot(self, priority: int):
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: int) -> None:
+        self._num_admitted += 1
+        if self._in_flight < self._max_concurrency and not self._waiters:
+            self._in_flight += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self._waiters,
+            (priority, document_rank.get(), next(self._arrivals), future),
+        )
+        self._num_queued += 1
+        self._max_queue_length = max(self._max_queue_length, len(self._waiters))
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before the cancellation
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        """Hands the slot straight to the best waiter, skipping ones that were cancelled."""
+        while self._waiters:
+            future = heapq.heappop(self._waiters)[-1]
+            if not future.done():
+                future.set_result(None)
+                return
+
+        self._in_flight -= 1
+
+    def metrics(self) -> dict:
+        return {
+            "max_concurrency": self._max_concurrency,
+            "num_admitted": self._num_admitted,
+            "num_queued": self._num_queued,
+            "max_queue_length": self._max_queue_length,
+        }
@@ -0,0 +1,157 @@
+import json
+import time
+import fcntl
+import asyncio
+from pathlib import Path
+from contextlib import contextmanager
+
+from loguru import logger
+
+
+class AdaptiveRateLimiter:
+    """
+    Token-bucket limiter for an API with requests-per-minute and tokens-per-minute quotas.
+
+    Both buckets refill continuously at `scale` times the configured quota and hold at most
+    `burst_seconds` worth of it, so a cold start doesn't fire a minute's quota at once. `scale` follows
+    AIMD: it grows by `increase_step` after every successful call and is multiplied by
+    `decrease_factor` when the API answers 429 (at most once per `cooldown_seconds`, so a
+    burst of rejections counts as one signal).
+
+    The bucket state lives in a small JSON file guarded by an exclusive file lock, so every
+    process on the machine that points at the same `state_path` shares one budget.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        state_path: str | Path,
+        min_scale: float = 0.05,
+        increase_step: float = 0.01,
+        decrease_factor: float = 0.5,
+        cooldown_seconds: float = 5.0,
+        burst_seconds: float = 5.0,
+    ) -> None:
+        self._requests_per_minute = requests_per_minute
+        self._tokens_per_minute = tokens_per_minute
+        self._state_path = Path(state_path)
+        self._lock_path = self._state_path.with_suffix(".lock")
+        self._min_scale = min_scale
+        self._increase_step = increase_step
+        self._decrease_factor = decrease_factor
+        self._cooldown_seconds = cooldown_seconds
+        self._burst_seconds = burst_seconds
+
+        self._num_requests = 0
+        self._num_throttled = 0
+        self._seconds_waited = 0.0
+
+        self._state_path.parent.mkdir(parents=True, exist_ok=True)
+
+    @contextmanager
+    def _locked_state(self):
+        """Yields the refilled shared state under the file lock and writes it back afterwards."""
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                now = time.time()
+                try:
+                    state = json.loads(self._state_path.read_text())
+                except (FileNotFoundError, json.JSONDecodeError):
+                    state = {
+                        "scale": 1.0,
+                        "requests": 0.0,
+                        "tokens": 0.0,
+                        "updated_at": now - self._burst_seconds,
+                        "last_decrease": 0.0,
+                    }
+
+                elapsed = max(now - state["updated_at"], 0.0)
+                request_rate, token_rate = self._rates(state)
+                state["requests"] = min(
+                    request_rate * self._burst_seconds,
+                    state["requests"] + elapsed * request_rate,
+                )
+                state["tokens"] = min(
+                    token_rate * self._burst_seconds,
+                    state["tokens"] + elapsed * token_rate,
+                )
+                state["updated_at"] = now
+
+                yield state
+
+                tmp_path = self._state_path.with_suffix(".tmp")
+                tmp_path.write_text(json.dumps(state))
+                tmp_path.replace(self._state_path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _rates(self, state: dict) -> tuple[float, float]:
+        """Current (requests, tokens) refill rates per second."""
+        return (
+            self._requests_per_minute * state["scale"] / 60,
+            self._tokens_per_minute * state["scale"] / 60,
+        )
+
+    def _try_take(self, tokens: int) -> float:
+        """Takes one request and `tokens` from the buckets, or returns how long to wait first."""
+        with self._locked_state() as state:
+            request_rate, token_rate = self._rates(state)
+            # A single call larger than the whole bucket would otherwise wait forever
+            tokens = min(tokens, token_rate * self._burst_seconds)
+
+            if state["requests"] >= 1 and state["tokens"] >= tokens:
+                state["requests"] -= 1
+                state["tokens"] -= tokens
+                return 0.0
+
+            return max(
+                (1 - state["requests"]) / request_rate,
+                (tokens - state["tokens"]) / token_rate,
+            )
+
+    async def acquire(self, tokens: int) -> None:
+        """Waits until one request with roughly `tokens` input + output tokens fits the budget."""
+        while (wait := await asyncio.to_thread(self._try_take, tokens)) > 0:
+            self._seconds_waited += wait
+            await asyncio.sleep(wait)
+
+        self._num_requests += 1
+
+    def record_success(self, estimated_tokens: int, actual_tokens: int | None) -> None:
+        """Raises the shared rate and corrects the token bucket by the tokens the call really used."""
+        with self._locked_state() as state:
+            state["scale"] = min(1.0, state["scale"] + self._increase_step)
+            if actual_tokens is not None:
+                state["tokens"] -= actual_tokens - estimated_tokens
+
+    def record_throttled(self) -> None:
+        """Shrinks the shared rate after a 429 and empties the request bucket to pause callers."""
+        self._num_throttled += 1
+        with self._locked_state() as state:
+            if state["updated_at"] - state["last_decrease"] < self._cooldown_seconds:
+                return
+
+            state["scale"] = max(self._min_scale, state["scale"] * self._decrease_factor)
+            state["last_decrease"] = state["updated_at"]
+            state["requests"] = 0.0
+            scale = state["scale"]
+
+        logger.warning(
+            f"Rate limited by the API, backing off to {scale:.0%} of the configured quota."
+        )
+
+    def metrics(self) -> dict:
+        """Current shared rate plus this process's request, throttle and wait counters."""
+        with self._locked_state() as state:
+            scale = state["scale"]
+
+        return {
+            "rate_scale": round(scale, 3),
+            "requests_per_minute": round(self._requests_per_minute * scale, 1),
+            "tokens_per_minute": round(self._tokens_per_minute * scale),
+            "num_requests": self._num_requests,
+            "num_throttled": self._num_throttled,
+            "seconds_waited": round(self._seconds_waited, 2),
+        }
@@ -1,15 +1,22 @@
 import os
 
 from boto3.session import Session
+from botocore.config import Config
 from dotenv import load_dotenv
 from loguru import logger
 
+from jarvis.settings import settings
+
 load_dotenv()
 
 MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT")
 MINIO_ACCESS_KEY = os.getenv("MINIO_ACCESS_KEY")
 MINIO_SECRET_KEY = os.getenv("MINIO_SECRET_KEY")
 
+# One connection per concurrent object download times its concurrent byte-range parts,
+# otherwise urllib3 discards connections and the fetch stage stalls on the default pool of 10
+MAX_POOL_CONNECTIONS = settings.FETCH_MAX_CONCURRENCY * settings.FETCH_PART_CONCURRENCY
+
 # --- Module-Level Client ---
 # This block of code will only run ONCE when the module is first imported.
 try:
@@ -19,7 +26,11 @@ try:
     s3_client = Session(
         aws_access_key_id=MINIO_ACCESS_KEY,
         aws_secret_access_key=MINIO_SECRET_KEY,
-    ).client("s3", endpoint_url=f"http://{MINIO_ENDPOINT}")
+    ).client(
+        "s3",
+        endpoint_url=f"http://{MINIO_ENDPOINT}",
+        config=Config(max_pool_connections=MAX_POOL_CONNECTIONS),
+    )
 
     s3_client.list_buckets()
     logger.success("Connection to MinIO storage client established successfully.")
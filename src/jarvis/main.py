@@ -1,7 +1,10 @@
 import typer
+from pathlib import Path
+from typing import Optional
+from datetime import datetime as dt
 from rich.console import Console
 
-from jarvis.settings import settings
+from jarvis.settings import settings, DATA_SOURCES_CONFIG
 
 app = typer.Typer()
 console = Console()
@@ -16,5 +19,127 @@ def main():
     pass
 
 
+@app.command()
+def reconcile_ledger():
+    """Rebuilds the local ingestion ledger from the payloads stored in Qdrant."""
+    from jarvis.infrastructure.ingestion_ledger import IngestionLedger
+    from jarvis.infrastructure.vector_db_client import connection
+
+    collections = [config["collection"] for config in DATA_SOURCES_CONFIG.values()]
+    num_objects = IngestionLedger().reconcile(connection, collections)
+
+    console.print(
+        f"[bold green]✔ Ledger reconciled:[/bold green] {num_objects} processed objects "
+        f"for pipeline version {settings.PIPELINE_VERSION}."
+    )
+
+
+_PARITY_SAMPLE_TEXTS = [
+    "Token buckets refill at a constant rate and allow short bursts up to their capacity.",
+    "A circuit breaker stops calling a failing dependency until a cool-down has passed.",
+    "Hierarchical chunking keeps whole chapters as parents and embeds small child chunks.",
+    "Memory-mapped files let several processes share data without copying it.",
+    "Int8 quantization trades a little accuracy for much faster CPU inference.",
+    "The ingestion ledger records which object versions were already processed.",
+    "Exponential backoff with jitter spreads retries out so they do not collide.",
+    "The recipe needs two cups of flour, a pinch of salt and some butter.",
+]
+
+
+@app.command()
+def check_model_parity(
+    backend: str = typer.Option(
+        settings.RAG_MODEL_BACKEND, help="'onnx', 'onnx-int8' or 'openvino'."
+    ),
+    texts_file: Optional[Path] = typer.Option(
+        None, help="Text file with one sample passage per line."
+    ),
+    query: str = typer.Option(
+        "How does the system handle API rate limits?",
+        help="Query the passages are reranked against.",
+    ),
+):
+    """Reports how far an inference backend drifts from the fp32 PyTorch models."""
+    from jarvis.application.embeddings import check_backend_parity
+
+    texts = (
+        [line for line in texts_file.read_text().splitlines() if line.strip()]
+        if texts_file
+        else _PARITY_SAMPLE_TEXTS
+    )
+    report = check_backend_parity(backend, texts, query)
+
+    embedding, cross_encoder = report["embedding"], report["cross_encoder"]
+    console.print(
+        f"[bold]{backend}[/bold] vs torch on {len(texts)} passages:\n"
+        f"  embeddings: mean cosine {embedding['mean_cosine']:.5f}, "
+        f"min cosine {embedding['min_cosine']:.5f}\n"
+        f"  cross-encoder: max score diff {cross_encoder['max_abs_score_diff']:.4f}, "
+        f"same ranking: {cross_encoder['same_ranking']}"
+    )
+
+
+@app.command()
+def watch(
+    mode: str = typer.Option(
+        settings.WATCH_MODE, help="'notifications' (MinIO events) or 'polling'."
+    ),
+    poll_interval: float = typer.Option(
+        settings.WATCH_POLL_INTERVAL_SECONDS, help="Seconds between listings."
+    ),
+    debounce: float = typer.Option(
+        settings.WATCH_DEBOUNCE_SECONDS,
+        help="Seconds without new uploads before a batch is ingested.",
+    ),
+):
+    """Watches the bucket and ingests new or changed objects as they are uploaded."""
+    from minio import Minio
+
+    from jarvis.infrastructure.bucket_events import (
+        BucketNotificationSource,
+        IncrementalListingSource,
+        watch_bucket,
+    )
+    from jarvis.infrastructure.storage_client import get_storage_client
+    from pipelines.ingestion_pipeline import ingestion_pipeline
+
+    if mode == "notifications":
+        source = BucketNotificationSource(
+            Minio(
+                settings.MINIO_ENDPOINT,
+                access_key=settings.MINIO_ACCESS_KEY,
+                secret_key=settings.MINIO_SECRET_KEY,
+                secure=False,
+            ),
+            bucket_name=settings.MINIO_BUCKET_NAME,
+        )
+    elif mode == "polling":
+        source = IncrementalListingSource(
+            get_storage_client(),
+            bucket_name=settings.MINIO_BUCKET_NAME,
+            poll_interval=poll_interval,
+            full_scan_every=settings.WATCH_FULL_SCAN_EVERY,
+        )
+    else:
+        console.print(f"[bold red]✖ Error:[/bold red] Unknown watch mode '{mode}'.")
+        raise typer.Exit(code=1)
+
+    def _ingest(object_keys: list[str]) -> None:
+        console.print(f"[bold cyan]Ingesting {len(object_keys)} objects...[/bold cyan]")
+        run_name = f"watch_run_{dt.now().strftime('%Y_%m_%d_%H_%M_%S')}"
+        # Keys can be overwritten in place, so step outputs must never be reused
+        ingestion_pipeline.with_options(run_name=run_name, enable_cache=False)(
+            object_keys=object_keys
+        )
+
+    console.print(
+        f"Watching bucket [yellow]{settings.MINIO_BUCKET_NAME}[/yellow] ({mode})..."
+    )
+    try:
+        watch_bucket(source, on_batch=_ingest, debounce=debounce)
+    except KeyboardInterrupt:
+        console.print("[bold green]Stopped watching.[/bold green]")
+
+
 if __name__ == "__main__":
     app()
@@ -9,6 +9,30 @@ class Settings(BaseSettings):
     # Gemini API
     GEMINI_MODEL_ID: str = "gemini-2.5-flash"
     GOOGLE_API_KEY: str | None = None
+    LLM_BACKEND: str = "gemini"  # "gemini" or "simulated"
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_TTL_SECONDS: float | None = 30 * 24 * 60 * 60
+    LLM_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    LLM_REQUESTS_PER_MINUTE: int = 1000
+    LLM_TOKENS_PER_MINUTE: int = 1_000_000
+    LLM_EXPECTED_OUTPUT_TOKENS: int = 1024
+    LLM_MAX_RETRIES: int = 4
+    LLM_CALL_TIMEOUT_SECONDS: float = 120.0
+    LLM_BREAKER_FAILURE_THRESHOLD: int = 5
+    LLM_BREAKER_RESET_SECONDS: float = 30.0
+    LLM_MAX_CONCURRENCY: int = 32  # In-flight calls; queued ones start by priority
+    LLM_ENRICHMENT_MAX_INPUT_TOKENS: int = 32_000  # Longer chapters are enriched in windows
+    LLM_PACK_SECTION_MAX_TOKENS: int = 2_000  # Shorter chapters share requests
+    LLM_PACK_MAX_TOKENS: int = 16_000
+    LLM_PACK_LINGER_SECONDS: float = 0.05
+
+    # Simulated LLM backend (LLM_BACKEND="simulated")
+    LLM_SIM_LATENCY_MEDIAN_SECONDS: float = 1.0
+    LLM_SIM_LATENCY_SIGMA: float = 0.5
+    LLM_SIM_RATE_LIMIT_RATE: float = 0.0
+    LLM_SIM_TIMEOUT_RATE: float = 0.0
+    LLM_SIM_TIMEOUT_SECONDS: float = 60.0
+    LLM_SIM_SEED: int = 0
 
     # Huggingface API
     HUGGINGFACE_ACCESS_TOKEN: str | None = None
@@ -19,6 +43,37 @@ class Settings(BaseSettings):
     MINIO_SECRET_KEY: str = "minioadmin"
     MINIO_BUCKET_NAME: str = "jarvis-bucket"
 
+    # Ingestion
+    INGESTION_CACHE_DIR: str = ".jarvis_cache"
+    PIPELINE_VERSION: str = "1"
+    INGESTION_STREAMING: bool = False  # Parse each book page by page inside its per-document flow
+    INGESTION_STREAM_CHAPTERS_IN_FLIGHT: int = 4
+    FETCH_STREAMING: bool = True
+    FETCH_MAX_CONCURRENCY: int = 8
+    FETCH_MAX_IN_FLIGHT_BYTES: int = 256 * 1024 * 1024
+    FETCH_SPILL_THRESHOLD_BYTES: int = 16 * 1024 * 1024
+    FETCH_STREAM_CHUNK_BYTES: int = 1024 * 1024
+    FETCH_MULTIPART_THRESHOLD_BYTES: int = 64 * 1024 * 1024
+    FETCH_PART_SIZE_BYTES: int = 16 * 1024 * 1024
+    FETCH_PART_CONCURRENCY: int = 4
+
+    # Parsing
+    PARSE_PARALLEL: bool = True
+    PARSE_MAX_WORKERS: int | None = None  # None uses every core
+    PARSE_SHARD_PAGES: int = 100
+    PARSE_CACHE_ENABLED: bool = True
+    PARSE_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024
+    PARSE_MODE: str = "auto"  # "auto", "fast" (plain text extraction) or "full" (layout analysis)
+    PARSE_AUTO_SAMPLE_PAGES: int = 12
+    PARSE_FAST_HEADER_SAMPLE_PAGES: int = 48  # Pages whose font sizes set fast mode's heading levels
+    PARSE_STREAM_HEADER_SAMPLE_PAGES: int = 48  # Same for full mode when a book is streamed
+
+    # Watch mode
+    WATCH_MODE: str = "notifications"  # "notifications" or "polling"
+    WATCH_POLL_INTERVAL_SECONDS: float = 30.0
+    WATCH_FULL_SCAN_EVERY: int = 20
+    WATCH_DEBOUNCE_SECONDS: float = 5.0
+
     # Qdrant vector database
     USE_QDRANT_CLOUD: bool = False
     QDRANT_DATABASE_HOST: str = "localhost"
@@ -30,6 +85,16 @@ class Settings(BaseSettings):
     TEXT_EMBEDDING_MODEL_ID: str = "all-MiniLM-L6-v2"
     RERANKING_CROSS_ENCODER: str = "ms-marco-MiniLM-L-4-v2"
     RAG_MODEL_DEVICE: str = "cpu"
+    RAG_MODEL_BACKEND: str = "torch"  # "torch", "onnx", "onnx-int8" or "openvino"
+    RAG_MODEL_QUANTIZATION: str = "avx512_vnni"  # int8 kernel set: "arm64", "avx2", "avx512" or "avx512_vnni"
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    EMBEDDING_BATCH_MAX_TOKENS: int = 16_384  # Padded tokens per batch
+    EMBEDDING_BATCH_MAX_SIZE: int = 256
+    EMBEDDING_GROUP_MIN_TEXTS: int = 256  # Enriched chunks a document collects before embedding them together
+    EMBEDDING_POOL_ENABLED: bool = True  # Embed in worker processes during ingestion
+    EMBEDDING_WORKERS: int | None = None  # None uses cores // threads per worker
+    EMBEDDING_THREADS_PER_WORKER: int = 2
 
 
 settings = Settings()
@@ -3,6 +3,7 @@ from .parse_and_structure import parse_documents
 from .structure_documents import structure_documents
 from .chunk_and_embed import chunk_and_embed
 from .load_into_vector_db import load_into_vector_db
+from .process_documents import process_documents, stream_documents
 
 __all__ = [
     "fetch_from_storage",
@@ -10,4 +11,6 @@ __all__ = [
     "structure_documents",
     "chunk_and_embed",
     "load_into_vector_db",
+    "process_documents",
+    "stream_documents",
 ]
@@ -5,13 +5,18 @@ from collections import defaultdict
 from loguru import logger
 from zenml import step, get_step_context
 
+from jarvis.application.embeddings import EmbeddingModelSingleton
 from jarvis.application.preprocessing.dispatchers import (
     EmbeddingDispatcher,
     ProcessingHandlerFactory,
 )
-from jarvis.application.utils import batch
 from jarvis.domain.chunks import Chunk
 from jarvis.domain.embedded_chunks import EmbeddedChunk
+from jarvis.infrastructure.llm_clients import (
+    CircuitOpenError,
+    get_rate_limiter,
+    llm_call_metrics,
+)
 
 
 async def _process_chunk_and_embed(structured_sections, parsed_documents):
@@ -38,7 +43,7 @@ async def _process_chunk_and_embed(structured_sections, parsed_documents):
         str(doc.id): md for doc, md in zip(parsed_documents, metadata_results)
     }
 
-    processing_tasks = []
+    processing_tasks, task_doc_ids = [], []
     for document in parsed_documents:
         processor = ProcessingHandlerFactory.create_handler(document.category)
         doc_metadata = doc_id_to_metadata.get(str(document.id))
@@ -59,6 +64,7 @@ async def _process_chunk_and_embed(structured_sections, parsed_documents):
                 doc_id=document.id,
             )
             processing_tasks.append(task)
+            task_doc_ids.append(str(document.id))
 
     if not processing_tasks:
         logger.warning("No processing tasks created. Returning empty list.")
@@ -66,8 +72,22 @@ async def _process_chunk_and_embed(structured_sections, parsed_documents):
 
     all_chunks_results = await asyncio.gather(*processing_tasks, return_exceptions=True)
 
+    # A document with a short-circuited chapter is left out entirely, so the ledger doesn't
+    # mark it as ingested and the next run enriches it again
+    short_circuited = {
+        doc_id
+        for doc_id, result in zip(task_doc_ids, all_chunks_results)
+        if isinstance(result, CircuitOpenError)
+    }
+    for doc_id in short_circuited:
+        logger.error(
+            f"LLM circuit was open while enriching document {doc_id}. Skipping all its chunks."
+        )
+
     all_processed_chunks = []
-    for result in all_chunks_results:
+    for doc_id, result in zip(task_doc_ids, all_chunks_results):
+        if doc_id in short_circuited:
+            continue
         if isinstance(result, Exception):
             logger.error(f"Error during chunk processing: {result}")
         elif isinstance(result, list):
@@ -75,11 +95,8 @@ async def _process_chunk_and_embed(structured_sections, parsed_documents):
 
     logger.info(f"Total processed chunks before embedding: {len(all_processed_chunks)}")
 
-    # Embedding stage
-    embedded_chunks = []
-    for batched_chunks in batch(all_processed_chunks, 32):
-        batched_embedded_chunks = EmbeddingDispatcher.dispatch(batched_chunks)
-        embedded_chunks.extend(batched_embedded_chunks)
+    # Embedding stage, all at once so the model can batch chunks of similar length
+    embedded_chunks = EmbeddingDispatcher.dispatch(all_processed_chunks)
 
     return all_processed_chunks, embedded_chunks
 
@@ -133,5 +150,8 @@ def _create_output_metadata(
 
     metadata["total_chunks"] = len(chunks)
     metadata["total_embedded_chunks"] = len(embedded_chunks)
+    metadata["llm_rate_limit"] = get_rate_limiter().metrics()
+    metadata["llm_calls"] = llm_call_metrics()
+    metadata["embedding"] = EmbeddingModelSingleton().metrics()
 
     return metadata
@@ -1,11 +1,25 @@
 from loguru import logger
+import time
 import asyncio
+import hashlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from jarvis.domain.mapping import get_category_from_object_key
 from typing_extensions import Annotated
 
 from zenml import step, get_step_context
 from qdrant_client.http import models
 
+from jarvis.infrastructure.downloads import (
+    ByteBudget,
+    DownloadResult,
+    cached_object_path,
+    download_ranged_to_file,
+    download_to_file,
+    sha256_file,
+)
+from jarvis.infrastructure.ingestion_ledger import IngestionLedger
 from jarvis.infrastructure.storage_client import s3_client
 from jarvis.infrastructure.vector_db_client import connection as qdrant_conn
 from jarvis.settings import settings, DATA_SOURCES_CONFIG
@@ -20,56 +34,89 @@ def _download_file_sync(bucket_name: str, key: str) -> bytes:
         return None
 
 
-async def _process_files_concurrently(objects: list[dict]) -> list[dict]:
-    loop = asyncio.get_running_loop()
-    tasks = []
-    valid_objects = []
+def _is_supported(obj: dict) -> bool:
+    """Only objects under a known category prefix can be routed to a collection."""
+    try:
+        get_category_from_object_key(obj["Key"])
+    except ValueError:
+        return False
 
-    for obj in objects:
-        key = obj["Key"]
-        etag = obj["ETag"].strip('"')
+    return True
 
-        try:
-            category = get_category_from_object_key(obj["Key"])
-            collection_name = DATA_SOURCES_CONFIG[category]["collection"]
-        except ValueError as e:
-            continue
 
-        conditions = [
-            models.FieldCondition(
-                key="metadata.source_file",
-                match=models.MatchValue(value=key),
-            ),
-            models.FieldCondition(
-                key="metadata.etag",
-                match=models.MatchValue(value=etag),
-            ),
+def _list_unprocessed_objects(ledger: IngestionLedger) -> list[dict]:
+    """
+    Lists the bucket page by page, resolving each page against the ingestion ledger
+    with one local query instead of a vector DB round trip per object.
+    """
+    paginator = s3_client.get_paginator("list_objects_v2")
+    pages = paginator.paginate(Bucket=settings.MINIO_BUCKET_NAME)
+
+    unprocessed = []
+    for page in pages:
+        objects = [
+            obj
+            for obj in page.get("Contents", [])
+            if not obj["Key"].endswith("/") and _is_supported(obj)
         ]
-        if (
-            qdrant_conn.count(
-                collection_name=collection_name,
-                count_filter=models.Filter(must=conditions),
-                exact=True,
-            ).count
-            > 0
-        ):
-            logger.info(f"Skipping {key}, already processed.")
-            continue
+        new_objects = ledger.filter_unprocessed(objects)
+
+        skipped = len(objects) - len(new_objects)
+        if skipped:
+            logger.info(f"Skipping {skipped} objects, already processed.")
+
+        unprocessed.extend(new_objects)
+
+    return unprocessed
+
+
+def _describe_objects(object_keys: list[str], ledger: IngestionLedger) -> list[dict]:
+    """
+    Builds listing-like entries for an explicit set of keys (e.g. from bucket notifications)
+    so that only those objects are fetched, without listing the whole bucket.
+    The HEAD requests run concurrently, up to FETCH_MAX_CONCURRENCY at a time.
+    """
+    candidates = [
+        key
+        for key in dict.fromkeys(object_keys)
+        if not key.endswith("/") and _is_supported({"Key": key})
+    ]
+
+    def _head(key: str) -> dict | None:
+        try:
+            head = s3_client.head_object(Bucket=settings.MINIO_BUCKET_NAME, Key=key)
+        except Exception as e:
+            logger.warning(f"Skipping {key}, object is not accessible: {e}")
+            return None
+
+        return {"Key": key, "ETag": head["ETag"], "Size": head["ContentLength"]}
 
-        valid_objects.append(obj)
+    with ThreadPoolExecutor(max_workers=settings.FETCH_MAX_CONCURRENCY) as executor:
+        objects = [obj for obj in executor.map(_head, candidates) if obj is not None]
+
+    return ledger.filter_unprocessed(objects)
+
+
+async def _process_files_concurrently(valid_objects: list[dict]) -> list[dict]:
+    loop = asyncio.get_running_loop()
+    tasks = []
 
     logger.info(f"Starting download of {len(valid_objects)} files from storage.")
 
+    executor = ThreadPoolExecutor(max_workers=settings.FETCH_MAX_CONCURRENCY)
     for obj in valid_objects:
         task = loop.run_in_executor(
-            None, _download_file_sync, settings.MINIO_BUCKET_NAME, obj["Key"]
+            executor, _download_file_sync, settings.MINIO_BUCKET_NAME, obj["Key"]
         )
         tasks.append(task)
 
     if not tasks:
         return []
 
-    results = await asyncio.gather(*tasks)
+    try:
+        results = await asyncio.gather(*tasks)
+    finally:
+        executor.shutdown(wait=False)
 
     files_to_process = []
     for obj, file_bytes in zip(valid_objects, results):
@@ -80,28 +127,232 @@ async def _process_files_concurrently(objects: list[dict]) -> list[dict]:
                     "metadata": {
                         "source_file": obj["Key"],
                         "etag": obj["ETag"].strip('"'),
+                        "content_sha256": hashlib.sha256(file_bytes).hexdigest(),
                     },
                 }
             )
     return files_to_process
 
 
+def _download_object(obj: dict, destination: Path) -> DownloadResult:
+    """Picks between a single GET and concurrent byte-range GETs based on object size."""
+    key = obj["Key"]
+    size = obj.get("Size", 0)
+
+    if size > settings.FETCH_MULTIPART_THRESHOLD_BYTES:
+        return download_ranged_to_file(
+            s3_client,
+            settings.MINIO_BUCKET_NAME,
+            key,
+            etag=obj["ETag"],
+            size=size,
+            destination=destination,
+            part_size=settings.FETCH_PART_SIZE_BYTES,
+            part_concurrency=settings.FETCH_PART_CONCURRENCY,
+            chunk_size=settings.FETCH_STREAM_CHUNK_BYTES,
+        )
+
+    return download_to_file(
+        s3_client,
+        settings.MINIO_BUCKET_NAME,
+        key,
+        destination,
+        buffer_whole=size <= settings.FETCH_SPILL_THRESHOLD_BYTES,
+        chunk_size=settings.FETCH_STREAM_CHUNK_BYTES,
+    )
+
+
+def _in_memory_bytes(size: int) -> int:
+    """How many bytes of an object a download holds in memory at once."""
+    if size > settings.FETCH_MULTIPART_THRESHOLD_BYTES:
+        return settings.FETCH_PART_CONCURRENCY * settings.FETCH_STREAM_CHUNK_BYTES
+    if size > settings.FETCH_SPILL_THRESHOLD_BYTES:
+        return settings.FETCH_STREAM_CHUNK_BYTES
+
+    return size
+
+
+async def _stream_files_to_disk(
+    valid_objects: list[dict],
+) -> tuple[list[dict], list[DownloadResult]]:
+    """
+    Streaming variant of `_process_files_concurrently`.
+    Objects are written to the local cache directory and only their paths are returned,
+    so peak memory is bounded by FETCH_MAX_CONCURRENCY and FETCH_MAX_IN_FLIGHT_BYTES
+    instead of by the size of the bucket.
+    """
+    loop = asyncio.get_running_loop()
+    downloads = []
+
+    logger.info(f"Starting streaming download of {len(valid_objects)} files.")
+    if not valid_objects:
+        return [], downloads
+
+    budget = ByteBudget(settings.FETCH_MAX_IN_FLIGHT_BYTES)
+    slots = asyncio.Semaphore(settings.FETCH_MAX_CONCURRENCY)
+    executor = ThreadPoolExecutor(max_workers=settings.FETCH_MAX_CONCURRENCY)
+
+    async def _fetch(obj: dict) -> dict | None:
+        key = obj["Key"]
+        etag = obj["ETag"].strip('"')
+        size = obj.get("Size", 0)
+        destination = cached_object_path(settings.INGESTION_CACHE_DIR, key, etag)
+        metadata = {"source_file": key, "etag": etag}
+
+        if destination.exists() and destination.stat().st_size == size:
+            logger.info(f"Using cached copy of {key}.")
+            metadata["content_sha256"] = await loop.run_in_executor(
+                executor, sha256_file, destination
+            )
+            return {"content_path": str(destination), "metadata": metadata}
+
+        async with slots, budget.reserve(_in_memory_bytes(size)):
+            try:
+                result = await loop.run_in_executor(
+                    executor, _download_object, obj, destination
+                )
+            except Exception as e:
+                logger.error(f"Error downloading {key}: {e}")
+                return None
+
+        downloads.append(result)
+        metadata["content_sha256"] = result.sha256
+        logger.info(
+            f"Downloaded {key}: {result.num_bytes / (1024 * 1024):.1f} MB "
+            f"in {result.seconds:.2f}s ({result.throughput_mb_s:.1f} MB/s, "
+            f"{result.num_parts} parts)"
+        )
+
+        return {"content_path": str(destination), "metadata": metadata}
+
+    try:
+        results = await asyncio.gather(*(_fetch(obj) for obj in valid_objects))
+    finally:
+        executor.shutdown(wait=False)
+
+    return [result for result in results if result is not None], downloads
+
+
+def _alias_known_content(docs: list[dict], ledger: IngestionLedger) -> list[dict]:
+    """
+    Drops documents whose bytes were already ingested under another key.
+    Cross-run duplicates are recorded in the ledger and attached to the existing chunks'
+    payloads as aliases; duplicates within this run ride along on their first copy's
+    metadata and are recorded once its chunks are loaded.
+    """
+    known = ledger.find_by_content_hash(
+        [doc["metadata"]["content_sha256"] for doc in docs]
+    )
+
+    unique_docs = {}
+    new_aliases = defaultdict(list)
+    for doc in docs:
+        metadata = doc["metadata"]
+        sha256 = metadata["content_sha256"]
+        alias = {"source_file": metadata["source_file"], "etag": metadata["etag"]}
+
+        if sha256 in known:
+            new_aliases[sha256].append(alias)
+        elif sha256 in unique_docs:
+            unique_docs[sha256]["metadata"].setdefault("aliases", []).append(alias)
+        else:
+            unique_docs[sha256] = doc
+            continue
+
+        logger.info(
+            f"Skipping {alias['source_file']}, identical content already queued or ingested."
+        )
+        if "content_path" in doc:
+            Path(doc["content_path"]).unlink(missing_ok=True)
+
+    for sha256, aliases in new_aliases.items():
+        canonical_key = known[sha256]
+        ledger.mark_processed(
+            (alias["source_file"], alias["etag"], sha256, canonical_key)
+            for alias in aliases
+        )
+
+        category = get_category_from_object_key(canonical_key)
+        try:
+            qdrant_conn.set_payload(
+                collection_name=DATA_SOURCES_CONFIG[category]["collection"],
+                payload={"aliases": ledger.aliases_of(sha256)},
+                points=models.Filter(
+                    must=[
+                        models.FieldCondition(
+                            key="metadata.content_sha256",
+                            match=models.MatchValue(value=sha256),
+                        )
+                    ]
+                ),
+                key="metadata",
+            )
+        except Exception as e:
+            logger.warning(f"Could not attach aliases to chunks of {canonical_key}: {e}")
+
+    return list(unique_docs.values())
+
+
+def _download_metadata(downloads: list[DownloadResult], seconds: float) -> dict:
+    """Summarizes per-object and aggregate throughput for the step output."""
+    total_bytes = sum(download.num_bytes for download in downloads)
+
+    return {
+        "downloaded_mb": round(total_bytes / (1024 * 1024), 2),
+        "aggregate_throughput_mb_s": round(
+            total_bytes / (1024 * 1024) / max(seconds, 1e-6), 2
+        ),
+        "per_object_throughput_mb_s": {
+            download.key: round(download.throughput_mb_s, 2) for download in downloads
+        },
+    }
+
+
 @step
-def fetch_from_storage() -> Annotated[list, "raw_documents"]:
-    paginator = s3_client.get_paginator("list_objects_v2")
-    pages = paginator.paginate(Bucket=settings.MINIO_BUCKET_NAME)
-    objects = [
-        obj
-        for page in pages
-        if "Contents" in page
-        for obj in page["Contents"]
-        if not obj["Key"].endswith("/")
-    ]
+def fetch_from_storage(
+    streaming: bool = settings.FETCH_STREAMING,
+    reconcile_ledger: bool = False,
+    object_keys: list[str] | None = None,
+) -> Annotated[list, "raw_documents"]:
+    """
+    Lists the bucket and fetches every object that hasn't been ingested yet.
+    With `streaming` enabled the artifact holds local file paths instead of raw bytes.
+    With `reconcile_ledger` the ingestion ledger is first rebuilt from Qdrant; a freshly
+    created ledger (first deploy, new machine) is always rebuilt.
+    With `object_keys` only those objects are considered instead of the whole bucket.
+    """
+    ledger = IngestionLedger()
+    if not reconcile_ledger and ledger.is_empty():
+        logger.info("Ingestion ledger is empty. Rebuilding it from Qdrant first.")
+        reconcile_ledger = True
+
+    if reconcile_ledger:
+        collections = [config["collection"] for config in DATA_SOURCES_CONFIG.values()]
+        ledger.reconcile(qdrant_conn, collections)
+
+    if object_keys is not None:
+        objects = _describe_objects(object_keys, ledger)
+    else:
+        objects = _list_unprocessed_objects(ledger)
+
+    output_metadata = {"streaming": streaming}
+    if streaming:
+        started = time.perf_counter()
+        docs, downloads = asyncio.run(_stream_files_to_disk(objects))
+        output_metadata.update(
+            _download_metadata(downloads, time.perf_counter() - started)
+        )
+    else:
+        docs = asyncio.run(_process_files_concurrently(objects))
+
+    num_fetched = len(docs)
+    docs = _alias_known_content(docs, ledger)
 
-    docs = asyncio.run(_process_files_concurrently(objects))
+    output_metadata["num_documents"] = len(docs)
+    output_metadata["num_duplicates"] = num_fetched - len(docs)
 
     step_context = get_step_context()
     step_context.add_output_metadata(
-        output_name="raw_documents", metadata={"num_documents": len(docs)}
+        output_name="raw_documents", metadata=output_metadata
     )
     return docs
@@ -4,14 +4,15 @@ from zenml import step
 
 from jarvis.application import utils
 from jarvis.domain.base import VectorBaseDocument
+from jarvis.infrastructure.ingestion_ledger import IngestionLedger
 
 
-@step
-def load_into_vector_db(
-    documents: Annotated[list, "documents"],
-) -> Annotated[bool, "successful"]:
-    logger.info(f"Loading {len(documents)} documents into vector storage.")
-
+def insert_documents(documents: list, record_in_ledger: bool = True) -> bool:
+    """
+    Bulk inserts documents into their collections and records searchable ones in the ledger.
+    Without `record_in_ledger` the caller records them with `record_ingested` once the
+    source object is fully loaded.
+    """
     grouped_documents = VectorBaseDocument.group_by_class(documents)
     for document_class, documents in grouped_documents.items():
         logger.info(f"Loading documents into {document_class.get_collection_name()}")
@@ -26,4 +27,33 @@ def load_into_vector_db(
 
                 return False
 
+        # Only searchable chunks mark a source object as ingested
+        if record_in_ledger and document_class.get_use_vector_index():
+            record_ingested(documents)
+
     return True
+
+
+def delete_documents(ids_by_class: dict[type, list]) -> None:
+    """Removes loaded documents again, e.g. the chapters of a book that failed partway."""
+    for document_class, ids in ids_by_class.items():
+        logger.info(
+            f"Removing {len(ids)} documents from {document_class.get_collection_name()}"
+        )
+        document_class.bulk_delete(ids)
+
+
+def record_ingested(documents: list) -> None:
+    """Marks the source objects referenced by loaded documents as ingested."""
+    entries = IngestionLedger.entries_from_documents(documents)
+    IngestionLedger().mark_processed(entries)
+    logger.info(f"Recorded {len(entries)} source objects in the ingestion ledger.")
+
+
+@step
+def load_into_vector_db(
+    documents: Annotated[list, "documents"],
+) -> Annotated[bool, "successful"]:
+    logger.info(f"Loading {len(documents)} documents into vector storage.")
+
+    return insert_documents(documents)
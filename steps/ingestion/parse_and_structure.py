@@ -1,24 +1,56 @@
 from typing_extensions import Annotated
 from io import BytesIO
+from pathlib import Path
 
+from loguru import logger
 from zenml import step
 
 from jarvis.application.preprocessing.dispatchers import ParsingDispatcher
+from jarvis.settings import settings
+
+
+def open_source(doc_data: dict) -> BytesIO | Path:
+    """Raw documents carry either in-memory bytes or a path to a spilled local copy."""
+    if "content_path" in doc_data:
+        return Path(doc_data["content_path"])
+
+    return BytesIO(doc_data["content_bytes"])
 
 
 @step
 def parse_documents(
     documents: Annotated[list, "raw_documents"],
+    parallel: bool = settings.PARSE_PARALLEL,
 ) -> Annotated[list, "parsed_documents"]:
-    parsed_documents = []
+    """
+    Parses raw documents into markdown.
+    With `parallel` enabled the page-range shards of every document, including a single
+    large book, are fanned out to a process pool of PARSE_MAX_WORKERS processes and a
+    document that fails to parse is skipped.
+    """
+    inputs = []
     for doc_data in documents:
-        content_stream = BytesIO(doc_data["content_bytes"])
+        content_stream = open_source(doc_data)
         metadata = doc_data["metadata"]
         filename = metadata["source_file"]
 
-        parsed_document = ParsingDispatcher.dispatch(
-            data_stream=content_stream, filename=filename, metadata=metadata
+        inputs.append((content_stream, filename, metadata))
+
+    if parallel and inputs:
+        results = ParsingDispatcher.dispatch_batch(
+            inputs, max_workers=settings.PARSE_MAX_WORKERS
+        )
+        parsed_documents = [result for result in results if result is not None]
+
+        logger.info(
+            f"Parsed {len(parsed_documents)}/{len(inputs)} documents in parallel."
         )
-        parsed_documents.append(parsed_document)
+    else:
+        parsed_documents = [
+            ParsingDispatcher.dispatch(
+                data_stream=content_stream, filename=filename, metadata=metadata
+            )
+            for content_stream, filename, metadata in inputs
+        ]
 
     return parsed_documents
@@ -0,0 +1,317 @@
+import time
+import uuid
+import asyncio
+from collections import defaultdict
+from contextlib import aclosing, nullcontext
+from typing_extensions import Annotated
+
+from loguru import logger
+from zenml import step, get_step_context
+
+from jarvis.application.embedding_pool import EmbeddingWorkerPool
+from jarvis.application.embeddings import EmbeddingModelSingleton
+from jarvis.application.factories import StorableDocumentFactory
+from jarvis.application.preprocessing.dispatchers import (
+    ChunkingDispatcher,
+    EmbeddingDispatcher,
+    ProcessingHandlerFactory,
+)
+from jarvis.application.preprocessing.streaming import BookStream
+from jarvis.domain.types import DataCategory
+from jarvis.settings import settings
+from jarvis.infrastructure.llm_clients import (
+    CircuitOpenError,
+    document_rank,
+    get_llm_scheduler,
+    get_rate_limiter,
+    llm_call_metrics,
+)
+
+from .load_into_vector_db import delete_documents, insert_documents, record_ingested
+from .parse_and_structure import open_source
+
+
+class _IngestionRun:
+    """Carries each document from its sections to loaded chunks, on its own schedule."""
+
+    def __init__(self, started: float, pool: EmbeddingWorkerPool | None) -> None:
+        self._started = started
+        self._pool = pool
+        # In-process embedding is CPU-bound and loading shares one client, so documents
+        # take turns; the worker pool queues its own tasks
+        self._embedding_lock = asyncio.Lock()
+        self._loading_lock = asyncio.Lock()
+        self.results: list[dict] = []
+
+    async def run(self, document, rank: int) -> bool:
+        # Inherited by every task this document spawns, e.g. its chapter enrichments
+        document_rank.set(rank)
+        processor = ProcessingHandlerFactory.create_handler(document.category)
+
+        # Both are critical-path calls and independent of each other
+        sections, doc_metadata = await asyncio.gather(
+            ChunkingDispatcher.dispatch(document),
+            processor.extract_document_metadata(document),
+        )
+        storable_sections = [StorableDocumentFactory.create(s) for s in sections]
+
+        if not doc_metadata or not getattr(doc_metadata, "title", None):
+            logger.warning(
+                f"Could not extract metadata for document {document.id}. Skipping all its sections."
+            )
+            return await self._load(document, storable_sections, [])
+
+        logger.info(f"Processing document '{doc_metadata.title}'...")
+
+        # Enriched chunks are collected per document and embedded in groups of at least
+        # EMBEDDING_GROUP_MIN_TEXTS: a chapter alone is too few texts for the length
+        # planner to form well-padded batches, but a group still goes to the embedder
+        # while later chapters' LLM calls are in flight
+        pending, embedded_chunks = [], []
+        chapter_results = await asyncio.gather(
+            *(
+                self._process_chapter(
+                    processor, section, doc_metadata, document, pending, embedded_chunks
+                )
+                for section in sections
+            ),
+            return_exceptions=True,
+        )
+
+        for result in chapter_results:
+            if isinstance(result, CircuitOpenError):
+                # Loading the rest would mark the source as ingested with this chapter
+                # unenriched; failing the document leaves it for the next run instead
+                raise result
+            elif isinstance(result, Exception):
+                logger.error(f"Error during chunk processing: {result}")
+
+        if pending:
+            embedded_chunks.extend(await self._embed(pending))
+
+        return await self._load(document, storable_sections, embedded_chunks)
+
+    async def run_stream(self, doc_data: dict, rank: int) -> bool:
+        """
+        Like `run` for a raw PDF book that is parsed page by page along the way: chapters are
+        enriched as their pages arrive, and every EMBEDDING_GROUP_MIN_TEXTS chunks are embedded
+        and loaded with their chapters, so the book's markdown is never held whole.
+        The source object is recorded in the ledger once the whole book is loaded; a book
+        that fails partway has its loaded chapters removed again.
+        """
+        document_rank.set(rank)
+        metadata = doc_data["metadata"]
+        document_id = uuid.uuid4()
+        processor = ProcessingHandlerFactory.create_handler(DataCategory.BOOKS)
+
+        async with BookStream(open_source(doc_data), metadata, document_id) as book:
+            snippet = await book.read_head(processor.metadata_snippet_chars)
+            doc_metadata = await processor.extract_metadata_from_snippet(snippet)
+            if not doc_metadata or not getattr(doc_metadata, "title", None):
+                logger.warning(
+                    f"Could not extract metadata for {metadata['source_file']}. Skipping it."
+                )
+                return self._record(document_id, 0, 0, True)
+
+            logger.info(
+                f"Streaming '{doc_metadata.title}' through the ingestion stages..."
+            )
+
+            sections, chunks = [], []
+            # Ids of the chapters and chunks loaded so far, by document class
+            loaded = defaultdict(list)
+            last_chunk = None
+            chapters = processor.process_stream(
+                book.chapters(),
+                book_metadata=doc_metadata,
+                doc_id=document_id,
+                max_in_flight=settings.INGESTION_STREAM_CHAPTERS_IN_FLIGHT,
+                return_exceptions=True,
+            )
+            try:
+                async with aclosing(chapters):
+                    async for chapter, result in chapters:
+                        sections.append(StorableDocumentFactory.create(chapter))
+                        if isinstance(result, CircuitOpenError):
+                            # Same as in `run`: leave the book for the next run
+                            raise result
+                        elif isinstance(result, Exception):
+                            logger.error(f"Error during chunk processing: {result}")
+                        else:
+                            chunks.extend(result)
+
+                        if len(chunks) >= settings.EMBEDDING_GROUP_MIN_TEXTS:
+                            group_last = await self._load_group(
+                                sections, chunks, loaded
+                            )
+                            last_chunk = group_last or last_chunk
+                            sections, chunks = [], []
+
+                group_last = await self._load_group(sections, chunks, loaded)
+                last_chunk = group_last or last_chunk
+            except Exception:
+                await asyncio.to_thread(delete_documents, loaded)
+                raise
+
+        if last_chunk is not None:
+            await asyncio.to_thread(record_ingested, [last_chunk])
+
+        num_chunks = sum(
+            len(ids) for cls, ids in loaded.items() if cls.get_use_vector_index()
+        )
+        num_sections = sum(len(ids) for ids in loaded.values()) - num_chunks
+
+        return self._record(document_id, num_sections, num_chunks, True)
+
+    async def _load_group(self, sections, chunks, loaded: dict):
+        """
+        Embeds and loads a streamed book's next chapters and chunks without recording the
+        source object in the ledger, adding their ids to `loaded`.
+        Returns the last loaded chunk, if any.
+        """
+        embedded_chunks = await self._embed(chunks) if chunks else []
+        documents = sections + embedded_chunks
+        # Recorded up front, a group that fails halfway is removed completely
+        for document in documents:
+            loaded[type(document)].append(document.id)
+
+        async with self._loading_lock:
+            successful = await asyncio.to_thread(
+                insert_documents, documents, record_in_ledger=False
+            )
+        if not successful:
+            raise RuntimeError("Failed to load the streamed chapters.")
+
+        return embedded_chunks[-1] if embedded_chunks else None
+
+    async def _process_chapter(
+        self, processor, section, doc_metadata, document, pending, embedded_chunks
+    ) -> None:
+        chunks = await processor.process(
+            chapter=section, book_metadata=doc_metadata, doc_id=document.id
+        )
+        pending.extend(chunks)
+        if len(pending) >= settings.EMBEDDING_GROUP_MIN_TEXTS:
+            group = pending[:]
+            pending.clear()
+            embedded_chunks.extend(await self._embed(group))
+
+    async def _embed(self, chunks) -> list:
+        if self._pool is not None:
+            return await EmbeddingDispatcher.dispatch_async(chunks, self._pool)
+
+        async with self._embedding_lock:
+            return await EmbeddingDispatcher.dispatch_async(chunks)
+
+    async def _load(self, document, storable_sections, embedded_chunks) -> bool:
+        async with self._loading_lock:
+            successful = await asyncio.to_thread(
+                insert_documents, storable_sections + embedded_chunks
+            )
+
+        return self._record(
+            document.id, len(storable_sections), len(embedded_chunks), successful
+        )
+
+    def _record(
+        self, document_id, num_sections: int, num_chunks: int, successful: bool
+    ) -> bool:
+        seconds = time.monotonic() - self._started
+        self.results.append(
+            {
+                "document_id": str(document_id),
+                "num_sections": num_sections,
+                "num_chunks": num_chunks,
+                "seconds_to_loaded": round(seconds, 2),
+                "successful": successful,
+            }
+        )
+        logger.info(
+            f"Document {document_id} loaded {seconds:.1f}s into the run "
+            f"with {num_chunks} chunks."
+        )
+
+        return successful
+
+
+async def _process_all_documents(
+    documents, pool: EmbeddingWorkerPool | None, streaming: bool = False
+) -> tuple[list[bool], list[dict]]:
+    ingestion_run = _IngestionRun(started=time.monotonic(), pool=pool)
+    run = ingestion_run.run_stream if streaming else ingestion_run.run
+    outcomes = await asyncio.gather(
+        *(run(document, rank) for rank, document in enumerate(documents)),
+        return_exceptions=True,
+    )
+
+    successes = []
+    for document, outcome in zip(documents, outcomes):
+        if isinstance(outcome, Exception):
+            name = document["metadata"]["source_file"] if streaming else document.id
+            logger.error(f"Failed to process document {name}: {outcome}")
+            outcome = False
+        successes.append(outcome)
+
+    return successes, ingestion_run.results
+
+
+def _run_documents(documents: list, streaming: bool = False) -> bool:
+    with (
+        EmbeddingWorkerPool() if settings.EMBEDDING_POOL_ENABLED else nullcontext()
+    ) as pool:
+        successes, results = asyncio.run(
+            _process_all_documents(documents, pool, streaming=streaming)
+        )
+
+    step_context = get_step_context()
+    step_context.add_output_metadata(
+        output_name="successful",
+        metadata={
+            "documents": results,
+            "seconds_to_first_loaded": min(
+                (r["seconds_to_loaded"] for r in results), default=None
+            ),
+            "seconds_to_all_loaded": max(
+                (r["seconds_to_loaded"] for r in results), default=None
+            ),
+            "total_chunks": sum(r["num_chunks"] for r in results),
+            "llm_scheduler": get_llm_scheduler().metrics(),
+            "llm_rate_limit": get_rate_limiter().metrics(),
+            "llm_calls": llm_call_metrics(),
+            "embedding": (
+                pool.metrics() if pool is not None else EmbeddingModelSingleton().metrics()
+            ),
+        },
+    )
+
+    return all(successes)
+
+
+@step
+def process_documents(
+    parsed_documents: Annotated[list, "parsed_documents"],
+) -> Annotated[bool, "successful"]:
+    """
+    Structures, enriches, embeds and loads every parsed document as its own flow
+    (sections and metadata -> chapter enrichment and embedding -> loading), all sharing one
+    priority scheduler for their LLM calls and, with EMBEDDING_POOL_ENABLED, one pool of
+    embedding worker processes. A document is loaded as soon as it is done instead of
+    waiting for the slowest document at every phase.
+    """
+    logger.info(f"Step started. Received {len(parsed_documents)} documents to process.")
+
+    return _run_documents(parsed_documents)
+
+
+@step
+def stream_documents(
+    raw_documents: Annotated[list, "raw_documents"],
+) -> Annotated[bool, "successful"]:
+    """
+    Counterpart of `process_documents` that parses as well: every raw PDF book is converted
+    page by page inside its own flow, so its chapters are enriched, embedded and loaded
+    while later pages are still being parsed, and no book's markdown is held whole.
+    """
+    logger.info(f"Step started. Received {len(raw_documents)} documents to stream.")
+
+    return _run_documents(raw_documents, streaming=True)